@@ -1,8 +1,8 @@
 from __future__ import annotations
 
 import os
-import smtplib
-from email.message import EmailMessage
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal, TypedDict
 
 from dotenv import load_dotenv
@@ -11,6 +11,9 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_qdrant import QdrantVectorStore
 from langgraph.graph import StateGraph, END
 
+from intent_classifier import IntentClassifier
+from ticket_outbox import TicketOutbox
+
 
 # =========================================================
 # State Definition
@@ -21,6 +24,7 @@ Category = Literal["product", "billing", "technical"]
 class AgentState(TypedDict):
     user_query: str
     category: Category
+    docs: list
     answer: str
 
 
@@ -34,6 +38,9 @@ load_dotenv()
 CLASSIFIER_MODEL = os.getenv("CLASSIFIER_MODEL", "gpt-4o-mini")
 RAG_MODEL = os.getenv("RAG_MODEL", "gpt-4.1")
 
+# Local classifier answers on its own above this confidence
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.5"))
+
 # Qdrant
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
@@ -41,13 +48,14 @@ EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
 
 # Email
 SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_PORT = int(os.getenv("SMTP_PORT") or "587")
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 
 FINANCE_TICKET_TO = os.getenv("FINANCE_TICKET_TO")
 TECH_TICKET_TO = os.getenv("TECH_TICKET_TO")
 FROM_NAME = os.getenv("TICKET_FROM_NAME", "Support Bot")
+OUTBOX_PATH = os.getenv("TICKET_OUTBOX_PATH", "ticket_outbox.db")
 
 
 # =========================================================
@@ -62,6 +70,9 @@ rag_llm = ChatOpenAI(
     model=RAG_MODEL,
 )
 
+# Fast local tier in front of classifier_llm (see intent_classifier.py)
+intent_model = IntentClassifier.for_intents("support")
+
 
 # =========================================================
 # Vector DB (Direct similarity search)
@@ -77,27 +88,58 @@ vector_db = QdrantVectorStore.from_existing_collection(
 
 
 # =========================================================
-# Email Utility
+# Speculative Retrieval
 # =========================================================
+# Retrieval for product questions starts together with classification
+# instead of after it. If the route turns out not to be "product", the
+# prefetched docs are simply dropped.
+
+retrieval_pool = ThreadPoolExecutor(max_workers=4)
+
+prefetch_stats = {
+    "used": 0,
+    "wasted": 0,
+    "saved_seconds": 0.0,
+}
+
+
+def retrieve_docs(query: str):
+    started_at = time.perf_counter()
+    docs = vector_db.similarity_search(query, k=4)
+    return docs, time.perf_counter() - started_at
 
-def send_email(to: str, subject: str, body: str):
-    msg = EmailMessage()
-    msg["From"] = f"{FROM_NAME} <{SMTP_USERNAME}>"
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.set_content(body)
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.send_message(msg)
+def prefetch_report() -> str:
+    used = prefetch_stats["used"]
+    wasted = prefetch_stats["wasted"]
+    saved_ms = prefetch_stats["saved_seconds"] * 1000
+
+    avg_saved = saved_ms / used if used else 0.0
+    return (
+        f"prefetch used {used}, wasted {wasted}, "
+        f"saved {saved_ms:.0f} ms total ({avg_saved:.0f} ms per product query)"
+    )
+
+
+# =========================================================
+# Email (durable outbox, delivered in the background)
+# =========================================================
+
+ticket_outbox = TicketOutbox(
+    path=OUTBOX_PATH,
+    smtp_host=SMTP_HOST,
+    smtp_port=SMTP_PORT,
+    username=SMTP_USERNAME,
+    password=SMTP_PASSWORD,
+    from_name=FROM_NAME,
+)
 
 
 # =========================================================
 # LangGraph Nodes
 # =========================================================
 
-def classify_node(state: AgentState) -> dict:
+def classify_with_llm(query: str) -> str:
     prompt = f"""
 You are a customer support classifier.
 
@@ -118,18 +160,50 @@ Rules:
 - No explanation
 
 User query:
-{state["user_query"]}
+{query}
 """
 
-    category = classifier_llm.invoke(prompt).content.strip()
+    return classifier_llm.invoke(prompt).content.strip()
+
+
+def classify_node(state: AgentState) -> dict:
+    query = state["user_query"]
+
+    # Confident local prediction: no LLM call, no need to prefetch
+    category, confidence = intent_model.predict(query)
+    if confidence >= INTENT_CONFIDENCE:
+        return {"category": category}
+
+    started_at = time.perf_counter()
+    prefetch = retrieval_pool.submit(retrieve_docs, query)
 
-    return {"category": category}
+    category = classify_with_llm(query)
+    classify_seconds = time.perf_counter() - started_at
+
+    if category != "product":
+        prefetch.cancel()  # no-op if already running; result is discarded
+        prefetch_stats["wasted"] += 1
+        return {"category": category}
+
+    docs, retrieval_seconds = prefetch.result()
+
+    # Run serially, this would have taken classify + retrieval
+    overlapped_seconds = time.perf_counter() - started_at
+    prefetch_stats["used"] += 1
+    prefetch_stats["saved_seconds"] += (
+        classify_seconds + retrieval_seconds - overlapped_seconds
+    )
+
+    return {"category": category, "docs": docs}
 
 
 def rag_answer_node(state: AgentState) -> dict:
     query = state["user_query"]
 
-    docs = vector_db.similarity_search(query, k=4)
+    # Normally prefetched by classify_node
+    docs = state.get("docs")
+    if docs is None:
+        docs, _ = retrieve_docs(query)
 
     context = "\n\n---\n\n".join(
         f"Source: {doc.metadata}\n{doc.page_content}"
@@ -161,7 +235,7 @@ QUESTION:
 
 
 def billing_ticket_node(state: AgentState) -> dict:
-    send_email(
+    ticket_outbox.enqueue(
         to=FINANCE_TICKET_TO,
         subject="[Billing Ticket] New request",
         body=f"User message:\n\n{state['user_query']}"
@@ -173,7 +247,7 @@ def billing_ticket_node(state: AgentState) -> dict:
 
 
 def technical_ticket_node(state: AgentState) -> dict:
-    send_email(
+    ticket_outbox.enqueue(
         to=TECH_TICKET_TO,
         subject="[Technical Ticket] New issue",
         body=f"User message:\n\n{state['user_query']}"
@@ -223,16 +297,21 @@ app = graph.compile()
 # =========================================================
 
 def main():
+    ticket_outbox.start()
     print("Support Bot started. Type 'exit' to quit.\n")
 
     while True:
         user_query = input("User: ").strip()
         if user_query.lower() in {"exit", "quit"}:
+            print(prefetch_report())
             break
 
         result = app.invoke({"user_query": user_query})
         print(f"\nBot: {result['answer']}\n")
 
+    # Deliver tickets raised just before exit
+    ticket_outbox.stop()
+
 
 if __name__ == "__main__":
     main()
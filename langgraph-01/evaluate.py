@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import types
+from collections import Counter, defaultdict
+
+
+# =========================================================
+# Router Evaluation Runner
+# =========================================================
+# Drives the compiled LangGraph `app` of chatbot.py (--graph support)
+# or tech-graph.py (--graph tech) over a labelled dataset, several
+# queries at a time, and reports per-category accuracy, tokens, latency
+# percentiles and the routes taken.
+#
+# Datasets use the intents/<name>.json format ("examples": text/label).
+#
+#   python evaluate.py --graph support --record runs/support.json
+#   python evaluate.py --graph support --replay runs/support.json
+#
+# --record saves each query's route and answer from a live run.
+# --replay (or --stub, which routes every query to its label) swaps
+# the LLMs, Qdrant and OpenAI clients for offline stand-ins, so the
+# runner works without network access or API keys.
+# =========================================================
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+GRAPHS = {
+    "support": {"module": "chatbot", "route_key": "category", "input_key": "user_query"},
+    "tech": {"module": "tech-graph", "route_key": "category", "input_key": "question"},
+}
+
+# The query being evaluated in the current task, so offline stand-ins
+# know which recording to answer with
+current_query = contextvars.ContextVar("current_query")
+
+# Tokens used by the current query
+current_usage = contextvars.ContextVar("current_usage")
+
+
+# =========================================================
+# Offline stand-ins
+# =========================================================
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+class Recordings:
+    def __init__(self, examples: list[dict], path: str | None):
+        self.by_query = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.by_query = json.load(f)
+
+        # --stub: the "model" routes every query to its label
+        self.labels = {ex["text"]: ex["label"] for ex in examples}
+
+    def route(self, query: str) -> str:
+        recorded = self.by_query.get(query)
+        return recorded["route"] if recorded else self.labels.get(query, "")
+
+    def answer(self, query: str) -> str:
+        recorded = self.by_query.get(query)
+        return recorded.get("answer", "") if recorded else f"(stub answer to: {query})"
+
+
+def _install_offline_support(recordings: Recordings):
+    """Patch what chatbot.py talks to before it is imported."""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    import langchain_qdrant
+
+    class RecordedChatModel(BaseChatModel):
+        kind: str
+
+        @property
+        def _llm_type(self) -> str:
+            return "recorded"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            query = current_query.get()
+            text = recordings.route(query) if self.kind == "route" else recordings.answer(query)
+
+            prompt_tokens = sum(_estimate_tokens(str(m.content)) for m in messages)
+            output_tokens = _estimate_tokens(text)
+            message = AIMessage(
+                content=text,
+                usage_metadata={
+                    "input_tokens": prompt_tokens,
+                    "output_tokens": output_tokens,
+                    "total_tokens": prompt_tokens + output_tokens,
+                },
+                response_metadata={"model_name": f"recorded-{self.kind}"},
+            )
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    class EmptyVectorStore:
+        def similarity_search(self, query, k=4):
+            return []
+
+    langchain_qdrant.QdrantVectorStore.from_existing_collection = classmethod(
+        lambda cls, **kwargs: EmptyVectorStore()
+    )
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+    def patch(module):
+        module.classifier_llm = RecordedChatModel(kind="route")
+        module.rag_llm = RecordedChatModel(kind="answer")
+
+    return patch
+
+
+def _install_offline_tech(recordings: Recordings):
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+
+    def create(model, messages, **kwargs):
+        query = current_query.get()
+        is_classifier = messages[0]["role"] == "user"
+        text = recordings.route(query) if is_classifier else recordings.answer(query)
+
+        prompt_tokens = sum(_estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = _estimate_tokens(text)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))],
+            usage=types.SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def patch(module):
+        module.client = types.SimpleNamespace(
+            chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))
+        )
+
+    return patch
+
+
+# =========================================================
+# Graph loading and token accounting
+# =========================================================
+
+def load_graph(name: str, patch=None):
+    # Evaluation must never email real ticket queues
+    os.environ["TICKET_OUTBOX_PATH"] = ":memory:"
+    sys.path.insert(0, HERE)
+
+    module_name = GRAPHS[name]["module"]
+    spec = importlib.util.spec_from_file_location(
+        module_name.replace("-", "_"), os.path.join(HERE, f"{module_name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+
+    if patch:
+        patch(module)
+
+    if name == "tech":
+        _count_openai_usage(module)
+
+    return module
+
+
+def _count_openai_usage(module):
+    # tech-graph.py calls the OpenAI client directly; wrap it to add
+    # each response's usage to the current query's total
+    create = module.client.chat.completions.create
+
+    def counting_create(*args, **kwargs):
+        response = create(*args, **kwargs)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            current_usage.get()["total_tokens"] += usage.total_tokens
+        return response
+
+    module.client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(
+            completions=types.SimpleNamespace(create=counting_create)
+        )
+    )
+
+
+# =========================================================
+# Runner
+# =========================================================
+
+async def evaluate_one(app, graph: str, example: dict, semaphore, callbacks_factory):
+    async with semaphore:
+        current_query.set(example["text"])
+        usage = {"total_tokens": 0}
+        current_usage.set(usage)
+
+        config = {}
+        handler = callbacks_factory() if callbacks_factory else None
+        if handler is not None:
+            config["callbacks"] = [handler]
+
+        started_at = time.perf_counter()
+        result = await app.ainvoke(
+            {GRAPHS[graph]["input_key"]: example["text"]}, config=config
+        )
+        latency_ms = (time.perf_counter() - started_at) * 1000
+
+        if handler is not None:
+            usage["total_tokens"] += sum(
+                u.get("total_tokens", 0) for u in handler.usage_metadata.values()
+            )
+
+    return {
+        "query": example["text"],
+        "label": example["label"],
+        "route": result.get(GRAPHS[graph]["route_key"]),
+        "answer": result.get("answer", ""),
+        "latency_ms": latency_ms,
+        "tokens": usage["total_tokens"],
+    }
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(results: list[dict], wall_seconds: float):
+    by_label = defaultdict(list)
+    for r in results:
+        by_label[r["label"]].append(r)
+
+    print(f"\n{'category':<12} {'n':>4} {'accuracy':>9} {'tokens/q':>9}")
+    for label, rows in sorted(by_label.items()):
+        accuracy = sum(r["route"] == label for r in rows) / len(rows)
+        tokens = sum(r["tokens"] for r in rows) / len(rows)
+        print(f"{label:<12} {len(rows):>4} {accuracy:>9.1%} {tokens:>9.0f}")
+
+    total = len(results)
+    accuracy = sum(r["route"] == r["label"] for r in results) / total
+    latencies = [r["latency_ms"] for r in results]
+
+    print(f"{'overall':<12} {total:>4} {accuracy:>9.1%} "
+          f"{sum(r['tokens'] for r in results) / total:>9.0f}")
+
+    print(
+        f"\nlatency ms   p50 {statistics.median(latencies):.0f}  "
+        f"p90 {percentile(latencies, 90):.0f}  "
+        f"p99 {percentile(latencies, 99):.0f}  "
+        f"max {max(latencies):.0f}"
+    )
+    print(f"throughput   {total / wall_seconds:.1f} queries/s")
+
+    routes = Counter(r["route"] for r in results)
+    print("routes       " + ", ".join(f"{route}: {n}" for route, n in routes.most_common()))
+
+    confusions = Counter((r["label"], r["route"]) for r in results if r["route"] != r["label"])
+    for (label, route), n in confusions.most_common(5):
+        print(f"  misrouted  {label} -> {route}: {n}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Evaluate a LangGraph router")
+    parser.add_argument("--graph", choices=GRAPHS, default="support")
+    parser.add_argument("--data", help="dataset (default: intents/<graph>.json)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int)
+    offline = parser.add_mutually_exclusive_group()
+    offline.add_argument("--replay", help="offline: answer from a --record file")
+    offline.add_argument("--stub", action="store_true", help="offline: route to labels")
+    parser.add_argument("--record", help="save routes and answers to this file")
+    parser.add_argument("--output", help="write per-query results as JSONL")
+    args = parser.parse_args()
+
+    data_path = args.data or os.path.join(HERE, "intents", f"{args.graph}.json")
+    with open(data_path, encoding="utf-8") as f:
+        examples = json.load(f)["examples"][: args.limit]
+
+    patch = None
+    if args.replay or args.stub:
+        recordings = Recordings(examples, args.replay)
+        installer = _install_offline_support if args.graph == "support" else _install_offline_tech
+        patch = installer(recordings)
+
+    module = load_graph(args.graph, patch)
+
+    callbacks_factory = None
+    if args.graph == "support":
+        from langchain_core.callbacks import UsageMetadataCallbackHandler
+        callbacks_factory = UsageMetadataCallbackHandler
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started_at = time.perf_counter()
+    results = await asyncio.gather(*(
+        evaluate_one(module.app, args.graph, example, semaphore, callbacks_factory)
+        for example in examples
+    ))
+    wall_seconds = time.perf_counter() - started_at
+
+    report(results, wall_seconds)
+
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as f:
+            json.dump(
+                {r["query"]: {"route": r["route"], "answer": r["answer"]} for r in results},
+                f,
+                indent=2,
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
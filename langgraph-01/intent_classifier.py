@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import time
+from collections import Counter
+
+
+# =========================================================
+# Local Intent Classifier
+# =========================================================
+# A fast tier in front of the LLM classifiers in chatbot.py and
+# tech-graph.py:
+#
+#   1. keyword rules    - a phrase that belongs to exactly one label
+#   2. TF-IDF centroids - cosine similarity to the mean of each
+#                         label's training examples
+#
+# Both run in microseconds with no network calls. predict() returns a
+# confidence; callers only trust it above a threshold and otherwise
+# fall back to the LLM.
+#
+# Training data lives in intents/<name>.json:
+#   {"rules": {label: [phrases]}, "examples": [{"text": ..., "label": ...}]}
+#
+# Retrain / benchmark:
+#   python intent_classifier.py train --data intents/support.json
+#   python intent_classifier.py bench --data intents/support.json
+# =========================================================
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _features(tokens: list[str]) -> Counter:
+    # Unigrams plus bigrams, so "not loading" differs from "loading"
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return features
+
+
+def _normalize(vector: dict) -> dict:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {key: weight / norm for key, weight in vector.items()}
+
+
+class IntentClassifier:
+    def __init__(self, rules: dict, idf: dict, centroids: dict):
+        self.rules = {
+            label: [" ".join(tokenize(phrase)) for phrase in phrases]
+            for label, phrases in rules.items()
+        }
+        self.idf = idf
+        self.centroids = centroids
+
+    # -----------------------------------------------------
+    # Training
+    # -----------------------------------------------------
+    @classmethod
+    def train(cls, rules: dict, examples: list[dict]) -> "IntentClassifier":
+        documents = [(_features(tokenize(ex["text"])), ex["label"]) for ex in examples]
+
+        doc_freq = Counter()
+        for features, _ in documents:
+            doc_freq.update(features.keys())
+
+        total = len(documents)
+        idf = {
+            feature: math.log((1 + total) / (1 + count)) + 1
+            for feature, count in doc_freq.items()
+        }
+
+        sums = {}
+        for features, label in documents:
+            vector = _normalize({f: c * idf[f] for f, c in features.items()})
+            label_sum = sums.setdefault(label, Counter())
+            for feature, weight in vector.items():
+                label_sum[feature] += weight
+
+        centroids = {label: _normalize(vector) for label, vector in sums.items()}
+        return cls(rules, idf, centroids)
+
+    # -----------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"rules": self.rules, "idf": self.idf, "centroids": self.centroids},
+                f,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["rules"], data["idf"], data["centroids"])
+
+    @classmethod
+    def for_intents(cls, name: str) -> "IntentClassifier":
+        """
+        Loads intents/<name>.model.json, or trains from intents/<name>.json
+        if no trained model has been written yet.
+        """
+        model_path = os.path.join(HERE, "intents", f"{name}.model.json")
+        if os.path.exists(model_path):
+            return cls.load(model_path)
+
+        data = load_dataset(os.path.join(HERE, "intents", f"{name}.json"))
+        return cls.train(data["rules"], data["examples"])
+
+    # -----------------------------------------------------
+    # Prediction
+    # -----------------------------------------------------
+    def predict(self, text: str) -> tuple[str, float]:
+        """
+        Returns (label, confidence in [0, 1]).
+        """
+        tokens = tokenize(text)
+
+        # Tier 1: keyword rules, trusted only when unambiguous
+        padded = f" {' '.join(tokens)} "
+        matched = {
+            label
+            for label, phrases in self.rules.items()
+            if any(f" {phrase} " in padded for phrase in phrases)
+        }
+        if len(matched) == 1:
+            return matched.pop(), 1.0
+
+        # Tier 2: cosine similarity to label centroids
+        features = _features(tokens)
+        vector = _normalize(
+            {f: c * self.idf[f] for f, c in features.items() if f in self.idf}
+        )
+
+        scores = sorted(
+            (
+                (sum(w * centroid.get(f, 0.0) for f, w in vector.items()), label)
+                for label, centroid in self.centroids.items()
+            ),
+            reverse=True,
+        )
+
+        best_score, best_label = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+
+        # Confidence is how clearly the best label beats the runner-up
+        confidence = (best_score - runner_up) / best_score if best_score > 0 else 0.0
+        return best_label, confidence
+
+
+def load_dataset(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =========================================================
+# CLI: retrain and benchmark
+# =========================================================
+
+def _train_command(args):
+    data = load_dataset(args.data)
+    model = IntentClassifier.train(data["rules"], data["examples"])
+
+    model_path = args.model or args.data.replace(".json", ".model.json")
+    model.save(model_path)
+    print(f"Trained on {len(data['examples'])} examples -> {model_path}")
+
+
+def _bench_command(args):
+    data = load_dataset(args.data)
+    examples = data["examples"]
+
+    saved_model = IntentClassifier.load(args.model) if args.model else None
+
+    latencies_ms = []
+    correct = confident = confident_correct = 0
+
+    for i, example in enumerate(examples):
+        # Without a saved model, score each example with a model trained
+        # on all the others (leave-one-out), not on the example itself
+        model = saved_model or IntentClassifier.train(
+            data["rules"], examples[:i] + examples[i + 1:]
+        )
+
+        started_at = time.perf_counter()
+        label, confidence = model.predict(example["text"])
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+
+        is_correct = label == example["label"]
+        correct += is_correct
+        if confidence >= args.threshold:
+            confident += 1
+            confident_correct += is_correct
+
+    latencies_ms.sort()
+    total = len(examples)
+    p95 = latencies_ms[min(total - 1, int(total * 0.95))]
+
+    print(f"examples            : {total}")
+    print(f"accuracy (all)      : {correct / total:.1%}")
+    print(f"answered locally    : {confident / total:.1%} (confidence >= {args.threshold})")
+    if confident:
+        print(f"accuracy (local)    : {confident_correct / confident:.1%}")
+    print(f"latency p50 / p95   : {statistics.median(latencies_ms):.3f} / {p95:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local intent classifier")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="train and write a model file")
+    train.add_argument("--data", required=True)
+    train.add_argument("--model")
+    train.set_defaults(func=_train_command)
+
+    bench = commands.add_parser(
+        "bench", help="accuracy and latency against labelled (LLM) examples"
+    )
+    bench.add_argument("--data", required=True)
+    bench.add_argument("--model", help="saved model (default: leave-one-out on --data)")
+    bench.add_argument("--threshold", type=float, default=0.5)
+    bench.set_defaults(func=_bench_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
+import os
 from typing import TypedDict, Literal
 
 from langgraph.graph import StateGraph, END
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from intent_classifier import IntentClassifier
+
 # -----------------------------------
 # ENV SETUP
 # -----------------------------------
 load_dotenv()
 client = OpenAI()
 
+# Local classifier answers on its own above this confidence
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.5"))
+intent_model = IntentClassifier.for_intents("tech")
+
 # -----------------------------------
 # STATE DEFINITION
 # -----------------------------------
@@ -19,9 +26,17 @@ class AgentState(TypedDict):
     answer: str
 
 # -----------------------------------
-# NODE 1: CLASSIFIER (LLM)
+# NODE 1: CLASSIFIER (LOCAL, THEN LLM)
 # -----------------------------------
 def classify_question(state: AgentState) -> AgentState:
+    # Fast path: confident local prediction, no LLM call
+    category, confidence = intent_model.predict(state["question"])
+    if confidence >= INTENT_CONFIDENCE:
+        return {
+            **state,
+            "category": category
+        }
+
     prompt = f"""
 Classify the following user question strictly as either:
 - tech
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+
+
+# =========================================================
+# Durable Ticket Outbox
+# =========================================================
+# Ticket nodes only write a row to a local SQLite outbox, which is
+# fast and survives restarts, so the user gets their reply without
+# waiting on the mail server. A background thread delivers pending
+# rows over one long-lived, authenticated SMTP connection, in batches,
+# retrying failures with exponential backoff.
+#
+# To try it without a real mail server:
+#   python -m aiosmtpd -n -l localhost:8025
+#   SMTP_HOST=localhost SMTP_PORT=8025 python chatbot.py
+# =========================================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_addr         TEXT    NOT NULL,
+    subject         TEXT    NOT NULL,
+    body            TEXT    NOT NULL,
+    status          TEXT    NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL    NOT NULL,
+    last_error      TEXT,
+    created_at      REAL    NOT NULL
+)
+"""
+
+
+class TicketOutbox:
+    def __init__(
+        self,
+        path: str,
+        smtp_host: str,
+        smtp_port: int,
+        username: str | None,
+        password: str | None,
+        from_name: str,
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 5.0,
+        idle_close_seconds: float = 60.0,
+    ):
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.from_name = from_name
+
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.idle_close_seconds = idle_close_seconds
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+        self._smtp = None
+        self._last_used = 0.0
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._stop_deadline = 0.0
+        self._thread = None
+
+    # -----------------------------------------------------
+    # Request path
+    # -----------------------------------------------------
+    def enqueue(self, to: str, subject: str, body: str) -> int:
+        now = time.time()
+        with self._db_lock:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (to_addr, subject, body, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (to, subject, body, now, now),
+            )
+            self._db.commit()
+
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    # -----------------------------------------------------
+    # Background sender
+    # -----------------------------------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="ticket-outbox", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Delivers what is already due (for up to `timeout` seconds), then
+        closes the SMTP connection.
+        """
+        self._stop_deadline = time.monotonic() + timeout
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            # Cleared before sending, so an enqueue during the batch is
+            # not lost and the next wait returns at once
+            self._wakeup.clear()
+            sent_any = self.deliver_due()
+
+            if self._stopping.is_set():
+                # Keep draining batch after batch until nothing due is left
+                if not sent_any or time.monotonic() >= self._stop_deadline:
+                    break
+                continue
+
+            if not sent_any:
+                if self._smtp and time.time() - self._last_used > self.idle_close_seconds:
+                    self._disconnect()
+                self._wakeup.wait(timeout=self.retry_base_seconds)
+
+        self._disconnect()
+
+    def deliver_due(self) -> bool:
+        """Sends one batch of due messages. Returns True if any were sent."""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id, to_addr, subject, body, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (time.time(), self.batch_size),
+            ).fetchall()
+
+        sent_any = False
+        for row_id, to, subject, body, attempts in rows:
+            try:
+                self._send(to, subject, body)
+            except Exception as exc:
+                # Retry this row later; the rest wait for a fresh connection
+                self._disconnect()
+                self._mark_failed(row_id, attempts + 1, exc)
+                break
+
+            self._mark_sent(row_id)
+            sent_any = True
+
+        return sent_any
+
+    def pending_count(self) -> int:
+        with self._db_lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return count
+
+    # -----------------------------------------------------
+    # SMTP connection (opened once, reused across messages)
+    # -----------------------------------------------------
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30)
+        server.ehlo()
+        if server.has_extn("starttls"):
+            server.starttls()
+            server.ehlo()
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _send(self, to: str, subject: str, body: str):
+        msg = EmailMessage()
+        msg["From"] = f"{self.from_name} <{self.username or 'support-bot@localhost'}>"
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        if self._smtp is None:
+            self._smtp = self._connect()
+
+        self._smtp.send_message(msg)
+        self._last_used = time.time()
+
+    # -----------------------------------------------------
+    # Bookkeeping
+    # -----------------------------------------------------
+    def _mark_sent(self, row_id: int):
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE outbox SET status = 'sent', last_error = NULL WHERE id = ?",
+                (row_id,),
+            )
+            self._db.commit()
+
+    def _mark_failed(self, row_id: int, attempts: int, exc: Exception):
+        status = "failed" if attempts >= self.max_attempts else "pending"
+        delay = self.retry_base_seconds * (2 ** (attempts - 1))
+
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                "last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, repr(exc), row_id),
+            )
+            self._db.commit()
@@ -1,5 +1,9 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
 from state import AgentState
+from validation import validate_files
 import re
 
 ALLOWED_FILES = {
@@ -12,6 +16,86 @@ ALLOWED_FILES = {
 
 client = OpenAI()
 
+MODEL = os.getenv("BUILDER_MODEL", "gpt-4.1")
+
+# Send only the files the review asks about and accept search/replace
+# edits on later iterations (set to 0 to resend every file each loop)
+DIFF_EDITS = os.getenv("CODER_DIFF_EDITS", "1") != "0"
+
+# Candidates generated and reviewed concurrently on the first pass
+# (1 keeps the single coder -> review loop)
+BEST_OF_N = int(os.getenv("BEST_OF_N", "1"))
+
+# Rough tokens for one candidate (a full coder pass plus a review), used
+# to fit N under a token budget before any candidate starts
+CANDIDATE_TOKEN_ESTIMATE = int(os.getenv("CANDIDATE_TOKEN_ESTIMATE", "12000"))
+
+# Consecutive validation failures sent back to the coder before the
+# output goes to the architect review anyway
+MAX_VALIDATION_RETRIES = int(os.getenv("MAX_VALIDATION_RETRIES", "3"))
+
+
+def record_usage(state: AgentState, node: str, response):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+
+    state.setdefault("usage", []).append({
+        "node": node,
+        "iteration": state.get("iteration", 0),
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+    })
+
+
+def total_tokens(state: AgentState) -> int:
+    return sum(
+        entry["prompt_tokens"] + entry["completion_tokens"]
+        for entry in state.get("usage", [])
+    )
+
+
+def summarize_file(path: str, content: str) -> str:
+    """
+    A few lines that describe a file without its full body: imports,
+    exports, top-level declarations and CSS selectors.
+    """
+    key_lines = [
+        line.strip()
+        for line in content.splitlines()
+        if line.strip().startswith(("import ", "export ", "function ", "const ", "<title"))
+        or (path.endswith(".css") and line.strip().endswith("{"))
+    ]
+
+    summary = f"{path} ({len(content.splitlines())} lines)"
+    if key_lines:
+        summary += ":\n" + "\n".join(f"  {line}" for line in key_lines[:12])
+    return summary
+
+
+def files_mentioned(review: str, files: dict) -> list:
+    # Reviews often say "App.tsx" rather than "src/App.tsx"
+    mentioned = [
+        path for path in files
+        if path in review or path.rsplit("/", 1)[-1] in review
+    ]
+    return mentioned or list(files)
+
+
+def format_errors(state: AgentState) -> str:
+    errors = state.get("validation_errors") or []
+    return "\n".join(f"- {error}" for error in errors) or "None"
+
+
+def seed_section(state: AgentState) -> str:
+    if not state.get("seed_plan"):
+        return ""
+    return f"""
+A plan already exists for a similar request. Reuse its structure and
+adapt it wherever this request differs:
+{state['seed_plan']}
+"""
+
 
 def architect_plan(state: AgentState) -> AgentState:
     prompt = f"""
@@ -37,7 +121,7 @@ The implementation MUST map EXACTLY to these files:
 
 User request:
 {state['user_request']}
-
+{seed_section(state)}
 Produce a clear technical plan covering:
 - Visual layout
 - Component structure
@@ -45,10 +129,12 @@ Produce a clear technical plan covering:
 - UX intent
 """
     response = client.chat.completions.create(
-        model="gpt-4.1",
+        model=MODEL,
         messages=[{"role": "user", "content": prompt}]
     )
 
+    record_usage(state, "architect_plan", response)
+
     state["plan"] = response.choices[0].message.content
     return state
 
@@ -57,6 +143,16 @@ Produce a clear technical plan covering:
 import json
 
 def coder(state: AgentState) -> AgentState:
+    state["iteration"] = state.get("iteration", 0) + 1
+
+    if DIFF_EDITS and state.get("files"):
+        try:
+            return coder_edit(state)
+        except ValueError as exc:
+            # Edits that do not apply cleanly are never half-applied;
+            # regenerate the full file map instead
+            print(f"Coder edits rejected, regenerating all files: {exc}")
+
     prompt = f"""
 You are a senior frontend developer.
 
@@ -81,13 +177,17 @@ Previous files (if any):
 Architect review feedback (if any):
 {state.get('review', 'N/A')}
 
+Validation errors to fix (if any):
+{format_errors(state)}
+
 Return ONLY the JSON file map.
 """
 
     response = client.chat.completions.create(
-        model="gpt-4.1",
+        model=MODEL,
         messages=[{"role": "user", "content": prompt}]
     )
+    record_usage(state, "coder", response)
 
     raw_output = response.choices[0].message.content.strip()
 
@@ -101,16 +201,202 @@ Return ONLY the JSON file map.
         if path not in ALLOWED_FILES:
             raise ValueError(f"Illegal file generated: {path}")
 
+    previous = state.get("files", {})
+    state["changed_files"] = sorted(
+        path for path, content in files.items()
+        if previous.get(path) != content
+    )
     state["files"] = files
     return state
 
 
+def apply_edits(files: dict, edits: list, rewrites: dict) -> tuple:
+    """
+    Applies search/replace edits and whole-file rewrites to a copy of
+    `files`. Every search string must match exactly once, so an edit
+    can never land in the wrong place.
+    """
+    updated = dict(files)
+    changed = set()
+
+    for path, content in rewrites.items():
+        if path not in ALLOWED_FILES:
+            raise ValueError(f"Illegal file generated: {path}")
+        updated[path] = content
+        changed.add(path)
+
+    for edit in edits:
+        path = edit.get("file")
+        search = edit.get("search", "")
+        replace = edit.get("replace", "")
+
+        if path not in ALLOWED_FILES:
+            raise ValueError(f"Illegal file generated: {path}")
+        if path not in updated:
+            raise ValueError(f"Edit targets a file that does not exist: {path}")
+
+        matches = updated[path].count(search) if search else 0
+        if matches != 1:
+            raise ValueError(
+                f"Edit for {path} must match exactly once, matched {matches} times:\n{search}"
+            )
+
+        updated[path] = updated[path].replace(search, replace, 1)
+        changed.add(path)
+
+    return updated, sorted(changed)
+
+
+def coder_edit(state: AgentState) -> AgentState:
+    files = state["files"]
+    errors = state.get("validation_errors") or []
+    if errors:
+        focus = files_mentioned("\n".join(errors), files)
+    else:
+        focus = files_mentioned(state.get("review", ""), files)
+
+    focus_files = {path: files[path] for path in focus}
+    other_files = "\n".join(
+        summarize_file(path, content)
+        for path, content in files.items()
+        if path not in focus
+    ) or "None"
+
+    prompt = f"""
+You are a senior frontend developer improving an existing website.
+
+STRICT RULES:
+- Output ONLY valid JSON
+- No markdown
+- No explanation
+- No extra text
+- Change ONLY what the review asks for
+- Use ONLY these files:
+  - index.html
+  - src/main.tsx
+  - src/App.tsx
+  - src/index.css
+
+Return this JSON shape:
+{{
+  "edits": [
+    {{"file": "<path>", "search": "<exact existing text>", "replace": "<new text>"}}
+  ],
+  "files": {{"<path>": "<full new content, only if rewriting a whole file>"}}
+}}
+
+Each "search" must be copied exactly from the current file and appear
+in it exactly once. Prefer small edits; use "files" only for large rewrites.
+
+Architecture plan:
+{state['plan']}
+
+Files to improve (full content):
+{focus_files}
+
+Other files (summary, unchanged unless needed):
+{other_files}
+
+Architect review feedback:
+{state.get('review', 'N/A')}
+
+Validation errors to fix (if any):
+{format_errors(state)}
+
+Return ONLY the JSON object.
+"""
+
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    record_usage(state, "coder", response)
+
+    raw_output = response.choices[0].message.content.strip()
+
+    try:
+        result = json.loads(raw_output)
+    except json.JSONDecodeError:
+        raise ValueError(f"Coder did not return valid JSON:\n{raw_output}")
+
+    state["files"], state["changed_files"] = apply_edits(
+        files,
+        result.get("edits", []),
+        result.get("files", {}),
+    )
+    return state
+
+
+def validate(state: AgentState) -> AgentState:
+    """
+    Local checks between coder and review. Failures go back to the coder
+    with the concrete errors; each one is a review call not spent.
+    """
+    errors = validate_files(state["files"])
+    state["validation_errors"] = errors
+
+    # Files changed by rejected passes still need the next review to see them
+    unreviewed = set(state.get("unreviewed_files", [])) | set(state.get("changed_files", []))
+
+    if not errors:
+        state["validation_failures"] = 0
+        state["changed_files"] = sorted(unreviewed)
+        state["unreviewed_files"] = []
+        return state
+
+    state["unreviewed_files"] = sorted(unreviewed)
+    state["validation_failures"] = state.get("validation_failures", 0) + 1
+    if state["validation_failures"] <= MAX_VALIDATION_RETRIES:
+        state["reviews_skipped"] = state.get("reviews_skipped", 0) + 1
+        print(f"Validation failed ({len(errors)} errors), back to coder:")
+    else:
+        state["changed_files"] = state["unreviewed_files"]
+        state["unreviewed_files"] = []
+        print(f"Validation still failing after {MAX_VALIDATION_RETRIES} retries, reviewing anyway:")
+    for error in errors:
+        print(f"  {error}")
+    return state
+
+
+def validation_passed(state: AgentState) -> bool:
+    return (
+        not state.get("validation_errors")
+        or state.get("validation_failures", 0) > MAX_VALIDATION_RETRIES
+    )
+
+
 def architect_review(state: AgentState) -> AgentState:
+    # A review resets the retry allowance for the next round of fixes
+    state["validation_failures"] = 0
+
+    files = state["files"]
+    changed = state.get("changed_files") or list(files)
+
+    if DIFF_EDITS and state.get("review") and len(changed) < len(files):
+        # Later iterations: full text of what changed, summary of the rest
+        changed_files = {path: files[path] for path in changed}
+        unchanged_summary = "\n".join(
+            summarize_file(path, content)
+            for path, content in files.items()
+            if path not in changed
+        )
+
+        files_section = f"""Changed files (full content):
+{changed_files}
+
+Unchanged files (summary, already reviewed):
+{unchanged_summary}
+
+Previous review:
+{state['review']}"""
+    else:
+        files_section = f"""Files:
+{files}"""
+
     prompt = f"""
 You are a senior frontend architect reviewing a website implementation.
 
-Files:
-{state['files']}
+{files_section}
 
 Evaluate on:
 - Visual quality
@@ -129,10 +415,12 @@ Score:
 """
 
     response = client.chat.completions.create(
-        model="gpt-4.1",
+        model=MODEL,
         messages=[{"role": "user", "content": prompt}]
     )
 
+    record_usage(state, "architect_review", response)
+
     content = response.choices[0].message.content
 
     import re
@@ -145,3 +433,142 @@ Score:
     state["review"] = review_match.group(1).strip()
     state["score"] = int(score_match.group(1))
     return state
+
+
+class CandidateBudget:
+    """
+    Tokens spent by all candidates of one fan-out, shared between their
+    threads, so the caps apply while candidates run and not only after.
+    Keeps every usage entry it is charged, failed candidates included.
+    """
+
+    def __init__(self, token_budget: int, spent: int):
+        self.token_budget = token_budget
+        self.spent = spent
+        self.reviews = 0
+        self.usage = []
+        self._charged = {}
+        self._lock = threading.Lock()
+
+    def charge(self, index: int, candidate: AgentState):
+        # Charges the candidate's usage entries added since its last charge
+        with self._lock:
+            entries = candidate["usage"][self._charged.get(index, 0):]
+            self._charged[index] = len(candidate["usage"])
+            for entry in entries:
+                entry["candidate"] = index
+            self.usage.extend(entries)
+            self.spent += sum(e["prompt_tokens"] + e["completion_tokens"] for e in entries)
+
+    def exhausted(self) -> bool:
+        return bool(self.token_budget) and self.spent >= self.token_budget
+
+    def claim_review(self) -> bool:
+        # Past the budget, only the first candidate to get here is reviewed,
+        # so the fan-out always produces a result
+        with self._lock:
+            if self.reviews and self.exhausted():
+                return False
+            self.reviews += 1
+            return True
+
+
+class BudgetExceeded(ValueError):
+    pass
+
+
+def generate_candidate(
+    state: AgentState, budget: CandidateBudget, index: int, max_iterations: int = 0
+) -> AgentState:
+    # Each candidate works on its own state so threads never share lists
+    candidate = {
+        "user_request": state["user_request"],
+        "plan": state["plan"],
+        "usage": [],
+    }
+
+    try:
+        while True:
+            candidate = validate(coder(candidate))
+            budget.charge(index, candidate)
+
+            if validation_passed(candidate):
+                break
+            # Out of budget or iterations: review what we have rather than retry
+            if budget.exhausted() or (max_iterations and candidate["iteration"] >= max_iterations):
+                break
+
+        if not budget.claim_review():
+            raise BudgetExceeded(f"token budget ({budget.token_budget}) spent before review")
+
+        return architect_review(candidate)
+    finally:
+        # Calls made before a failure are still paid for
+        budget.charge(index, candidate)
+
+
+def best_of_n(
+    state: AgentState, token_budget: int = 0, max_iterations: int = 0
+) -> AgentState:
+    """
+    First pass with BEST_OF_N > 1: generates N candidates from the same
+    plan at once, each reviewed as soon as it is written, and keeps the
+    highest scoring one. Later iterations improve only that candidate.
+
+    With a token budget, N is first cut to what the remaining budget
+    fits at CANDIDATE_TOKEN_ESTIMATE each; candidates then stop retrying
+    once the shared budget is spent.
+    """
+    n = max(1, BEST_OF_N)
+    spent = total_tokens(state)
+
+    if token_budget:
+        fits = max(1, (token_budget - spent) // CANDIDATE_TOKEN_ESTIMATE)
+        if fits < n:
+            print(f"Token budget fits {fits} of {n} candidates")
+            n = fits
+
+    budget = CandidateBudget(token_budget, spent)
+    candidates = []
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = {
+            pool.submit(generate_candidate, state, budget, index, max_iterations): index
+            for index in range(n)
+        }
+
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                candidate = future.result()
+            except ValueError as exc:
+                # A malformed candidate only loses its place in the race
+                errors.append(f"candidate {index}: {exc}")
+                continue
+
+            candidates.append((index, candidate))
+
+    # Every candidate's calls count toward the job's cost, not just the
+    # winner's, including candidates that failed or were refused a review
+    state.setdefault("usage", []).extend(budget.usage)
+
+    if not candidates:
+        raise ValueError("No usable candidate:\n" + "\n".join(errors))
+
+    best_index, best = max(candidates, key=lambda item: item[1]["score"])
+
+    state["candidates"] = sorted(
+        ({"index": index, "score": candidate["score"]} for index, candidate in candidates),
+        key=lambda c: c["index"],
+    )
+    state["chosen_candidate"] = best_index
+    state["reviews_skipped"] = state.get("reviews_skipped", 0) + sum(
+        candidate.get("reviews_skipped", 0) for _, candidate in candidates
+    )
+    state["iteration"] = best["iteration"]
+    state["files"] = best["files"]
+    state["changed_files"] = best["changed_files"]
+    state["review"] = best["review"]
+    state["score"] = best["score"]
+    return state
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+# ----------------------------------
+# Content-addressed artifact store
+# ----------------------------------
+# Finished generations (plan, files, review, score) keyed by a hash of
+# the normalized request and the model settings that produced them.
+# Identical or trivially different requests are answered from here
+# instantly; otherwise the plan of the most similar cached request can
+# seed the architect. Entries are evicted by age and by total size,
+# least recently used first.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key          TEXT    PRIMARY KEY,
+    settings_key TEXT    NOT NULL,
+    request      TEXT    NOT NULL,
+    plan         TEXT    NOT NULL,
+    result       TEXT    NOT NULL,
+    size         INTEGER NOT NULL,
+    created_at   REAL    NOT NULL,
+    last_used_at REAL    NOT NULL
+)
+"""
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_request(request: str) -> str:
+    # Case, punctuation and spacing never change what gets built
+    return " ".join(_WORD_RE.findall(request.lower()))
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _similarity(a: str, b: str) -> float:
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 50_000_000,
+        max_age_seconds: float = 7 * 24 * 3600,
+    ):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_SCHEMA)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS artifacts_settings ON artifacts (settings_key)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.seeded = 0
+
+    @staticmethod
+    def key_for(request: str, settings: dict) -> Tuple[str, str]:
+        settings_key = _hash(json.dumps(settings, sort_keys=True))
+        return _hash(normalize_request(request), settings_key), settings_key
+
+    def get(self, request: str, settings: dict) -> Optional[dict]:
+        key, _ = self.key_for(request, settings)
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM artifacts WHERE key = ? AND created_at > ?",
+                (key, now - self.max_age_seconds),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE artifacts SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def closest_plan(
+        self, request: str, settings: dict, min_similarity: float = 0.5
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        Returns (cached request, plan, similarity) for the most similar
+        request built with the same settings, or None below min_similarity.
+        """
+        normalized = normalize_request(request)
+        _, settings_key = self.key_for(request, settings)
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT request, plan FROM artifacts WHERE settings_key = ? AND created_at > ?",
+                (settings_key, time.time() - self.max_age_seconds),
+            ).fetchall()
+
+        best = None
+        for cached_request, plan in rows:
+            similarity = _similarity(normalized, cached_request)
+            if similarity >= min_similarity and (best is None or similarity > best[2]):
+                best = (cached_request, plan, similarity)
+
+        if best is not None:
+            self.seeded += 1
+        return best
+
+    def put(self, request: str, settings: dict, result: dict):
+        key, settings_key = self.key_for(request, settings)
+        payload = json.dumps(result)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(key, settings_key, request, plan, result, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, settings_key, normalize_request(request), result["plan"],
+                 payload, size, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        self._db.execute(
+            "DELETE FROM artifacts WHERE created_at <= ?", (now - self.max_age_seconds,)
+        )
+
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM artifacts"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._db.execute(
+            "SELECT key, size FROM artifacts ORDER BY last_used_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "seeded_plans": self.seeded,
+        }
@@ -0,0 +1,59 @@
+import argparse
+from collections import defaultdict
+
+import agents
+import graph
+from graph import build_graph
+
+# ----------------------------------
+# Tokens per iteration: full resend vs diff edits
+# ----------------------------------
+# Runs the same request twice through the real graph (this calls the
+# OpenAI API), once with every file resent each loop and once with
+# search/replace edits, and prints prompt/completion tokens per
+# coder iteration for both.
+
+
+def run(request: str, diff_edits: bool, max_iterations: int):
+    agents.DIFF_EDITS = diff_edits
+    # The graph stops at the cap and keeps its best result, so runs that
+    # never reach an accepted score still report their tokens
+    graph.MAX_ITERATIONS = max_iterations
+    graph_app = build_graph()
+
+    result = graph_app.invoke(
+        {"user_request": request},
+        {"recursion_limit": 1000}
+    )
+
+    per_iteration = defaultdict(lambda: [0, 0])
+    for entry in result.get("usage", []):
+        totals = per_iteration[entry["iteration"]]
+        totals[0] += entry["prompt_tokens"]
+        totals[1] += entry["completion_tokens"]
+
+    return per_iteration, result["score"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("request")
+    parser.add_argument("--max-iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, diff_edits in (("full resend", False), ("diff edits", True)):
+        per_iteration, score = run(args.request, diff_edits, args.max_iterations)
+
+        print(f"\n{label} (final score {score})")
+        print(f"{'iteration':>10} {'prompt':>8} {'completion':>11}")
+        for iteration, (prompt, completion) in sorted(per_iteration.items()):
+            # Iteration 0 is the architect plan
+            name = "plan" if iteration == 0 else iteration
+            print(f"{name:>10} {prompt:>8} {completion:>11}")
+
+        total = sum(p + c for p, c in per_iteration.values())
+        print(f"{'total':>10} {total:>20}")
+
+
+if __name__ == "__main__":
+    main()
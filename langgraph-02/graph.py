@@ -1,33 +1,108 @@
+import os
+
 from langgraph.graph import StateGraph, END
 from state import AgentState
-from agents import architect_plan, coder, architect_review
+import agents
+from agents import (
+    architect_plan, coder, validate, architect_review, best_of_n,
+    total_tokens, validation_passed,
+)
+
+# Cost caps: stop improving after this many coder iterations or once
+# the job has used this many tokens, keeping the best result so far
+# (0 = no cap)
+MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "0"))
+TOKEN_BUDGET = int(os.getenv("TOKEN_BUDGET", "0"))
+
+# Review score that accepts a site
+PASSING_SCORE = 8
+
+
+def generation_settings() -> dict:
+    """Everything besides the request that changes what gets generated."""
+    return {
+        "model": agents.MODEL,
+        "best_of_n": agents.BEST_OF_N,
+        "max_iterations": MAX_ITERATIONS,
+        "token_budget": TOKEN_BUDGET,
+    }
 
 
 def review_router(state: AgentState) -> str:
-    if state["score"] >= 8:
+    if state["score"] >= PASSING_SCORE:
+        return "end"
+
+    if MAX_ITERATIONS and state.get("iteration", 0) >= MAX_ITERATIONS:
+        print(f"Stopping at iteration cap ({MAX_ITERATIONS}) with score {state['score']}")
         return "end"
+
+    if TOKEN_BUDGET and total_tokens(state) >= TOKEN_BUDGET:
+        print(f"Stopping at token budget ({TOKEN_BUDGET}) with score {state['score']}")
+        return "end"
+
     return "improve"
 
 
+def validation_router(state: AgentState) -> str:
+    # Broken output skips the (expensive) architect review
+    if validation_passed(state):
+        return "review"
+
+    # At a cap, review what we have rather than retry
+    if MAX_ITERATIONS and state.get("iteration", 0) >= MAX_ITERATIONS:
+        print(f"Iteration cap ({MAX_ITERATIONS}) reached with validation errors, reviewing anyway")
+        return "review"
+
+    if TOKEN_BUDGET and total_tokens(state) >= TOKEN_BUDGET:
+        print(f"Token budget ({TOKEN_BUDGET}) reached with validation errors, reviewing anyway")
+        return "review"
+
+    return "fix"
+
+
+def best_of_n_node(state: AgentState) -> AgentState:
+    # The caps apply inside the fan-out too, not only once it is done
+    return best_of_n(state, TOKEN_BUDGET, MAX_ITERATIONS)
+
+
 def build_graph():
     graph = StateGraph(AgentState)
 
     graph.add_node("architect_plan", architect_plan)
     graph.add_node("coder", coder)
+    graph.add_node("validate", validate)
     graph.add_node("architect_review", architect_review)
 
     graph.set_entry_point("architect_plan")
 
-    graph.add_edge("architect_plan", "coder")
-    graph.add_edge("coder", "architect_review")
+    routes = {
+        "improve": "coder",
+        "end": END
+    }
+
+    if agents.BEST_OF_N > 1:
+        # First pass: N candidates reviewed in parallel, then iterate on the best
+        graph.add_node("best_of_n", best_of_n_node)
+        graph.add_edge("architect_plan", "best_of_n")
+        graph.add_conditional_edges("best_of_n", review_router, routes)
+    else:
+        graph.add_edge("architect_plan", "coder")
+
+    graph.add_edge("coder", "validate")
 
     graph.add_conditional_edges(
-        "architect_review",
-        review_router,
+        "validate",
+        validation_router,
         {
-            "improve": "coder",
-            "end": END
+            "fix": "coder",
+            "review": "architect_review"
         }
     )
 
+    graph.add_conditional_edges(
+        "architect_review",
+        review_router,
+        routes
+    )
+
     return graph.compile()
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from graph import PASSING_SCORE
+
+
+# Generations running at once; the rest wait their turn
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+
+# Finished jobs are forgotten after this long
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+
+class Job:
+    """
+    One website generation. Progress events are appended as the graph
+    runs, and any number of listeners can follow them.
+    """
+
+    def __init__(self, request: str, use_cache: bool = True):
+        self.id = str(uuid.uuid4())
+        self.request = request
+        self.use_cache = use_cache
+        self.cached = False
+        self.status = "queued"
+        self.created_at = time.time()
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.events: List[dict] = []
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: dict):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def follow(self):
+        """Yields every event, past and future, until the job ends."""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > sent)
+                new_events = self.events[sent:]
+
+            for event in new_events:
+                sent += 1
+                yield event
+                if event["type"] in ("done", "error"):
+                    return
+
+
+class JobManager:
+    def __init__(
+        self,
+        graph_app,
+        max_concurrent: int = MAX_CONCURRENT_JOBS,
+        store=None,
+        settings: Optional[dict] = None,
+    ):
+        self.graph_app = graph_app
+        self.store = store
+        self.settings = settings or {}
+        self.jobs: Dict[str, Job] = {}
+        self.max_concurrent = max_concurrent
+        self._slots = None
+
+    def submit(self, request: str, use_cache: bool = True) -> Job:
+        # Created on first use so it binds to the server's event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        job = Job(request, use_cache)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def _run(self, job: Job):
+        if self.store is not None and job.use_cache:
+            cached = await asyncio.to_thread(self.store.get, job.request, self.settings)
+            if cached is not None:
+                # Served without waiting for a generation slot
+                job.status = "done"
+                job.cached = True
+                job.result = cached
+                await job.publish({"type": "started"})
+                await job.publish({"type": "done", "cached": True, "result": job.result})
+                self._expire(job)
+                return
+
+        async with self._slots:
+            job.status = "running"
+            await job.publish({"type": "started"})
+
+            iteration = 0
+            final_state = {}
+            inputs = {"user_request": job.request}
+
+            if self.store is not None and job.use_cache:
+                seed = await asyncio.to_thread(
+                    self.store.closest_plan, job.request, self.settings
+                )
+                if seed is not None:
+                    seed_request, inputs["seed_plan"], similarity = seed
+                    await job.publish({
+                        "type": "seeded",
+                        "from_request": seed_request,
+                        "similarity": round(similarity, 3),
+                    })
+
+            try:
+                async for update in self.graph_app.astream(
+                    inputs,
+                    stream_mode="updates",
+                ):
+                    for node, state in update.items():
+                        final_state.update(state)
+
+                        if node == "architect_plan":
+                            await job.publish({"type": "plan", "plan": state["plan"]})
+
+                        elif node == "coder":
+                            iteration += 1
+                            await job.publish({
+                                "type": "code",
+                                "iteration": iteration,
+                                "files": sorted(state["files"]),
+                                "changed_files": state.get("changed_files", []),
+                            })
+
+                        elif node == "best_of_n":
+                            iteration += 1
+                            await job.publish({
+                                "type": "candidates",
+                                "iteration": iteration,
+                                "candidates": state["candidates"],
+                                "chosen": state["chosen_candidate"],
+                                "files": sorted(state["files"]),
+                            })
+                            await job.publish({
+                                "type": "review",
+                                "iteration": iteration,
+                                "score": state["score"],
+                                "review": state["review"],
+                            })
+
+                        elif node == "validate" and state["validation_errors"]:
+                            await job.publish({
+                                "type": "validation",
+                                "iteration": iteration,
+                                "errors": state["validation_errors"],
+                                "reviews_skipped": state.get("reviews_skipped", 0),
+                            })
+
+                        elif node == "architect_review":
+                            await job.publish({
+                                "type": "review",
+                                "iteration": iteration,
+                                "score": state["score"],
+                                "review": state["review"],
+                            })
+
+            except Exception as exc:
+                job.status = "failed"
+                job.error = str(exc)
+                await job.publish({"type": "error", "error": job.error})
+
+            else:
+                job.status = "done"
+                job.result = {
+                    "plan": final_state["plan"],
+                    "files": final_state["files"],
+                    "review": final_state["review"],
+                    "score": final_state["score"],
+                    "reviews_skipped": final_state.get("reviews_skipped", 0),
+                }
+                # Runs stopped by a cap below the passing score are not
+                # served to the next identical request as if accepted
+                if self.store is not None and job.result["score"] >= PASSING_SCORE:
+                    await asyncio.to_thread(
+                        self.store.put, job.request, self.settings, job.result
+                    )
+                await job.publish({"type": "done", "cached": False, "result": job.result})
+
+        self._expire(job)
+
+    def _expire(self, job: Job):
+        asyncio.get_running_loop().call_later(
+            JOB_TTL_SECONDS, self.jobs.pop, job.id, None
+        )
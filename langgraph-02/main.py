@@ -1,25 +1,104 @@
-from fastapi import FastAPI
+import json
+import os
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from graph import build_graph
+from artifact_store import ArtifactStore
+from graph import build_graph, generation_settings
+from jobs import JobManager
 
 app = FastAPI(title="AI Website Builder")
 
 graph_app = build_graph()
 
+# Finished generations, reused for repeated requests (empty path disables)
+ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", "artifacts.db")
+
+artifact_store = ArtifactStore(
+    ARTIFACT_STORE_PATH,
+    max_bytes=int(os.getenv("ARTIFACT_STORE_MAX_BYTES", "50000000")),
+    max_age_seconds=float(os.getenv("ARTIFACT_STORE_MAX_AGE_SECONDS", str(7 * 24 * 3600))),
+) if ARTIFACT_STORE_PATH else None
+
+job_manager = JobManager(
+    graph_app,
+    store=artifact_store,
+    settings=generation_settings()
+)
+
 
 class WebsiteRequest(BaseModel):
     request: str
+    # False forces a fresh generation (the result is still stored)
+    use_cache: bool = True
 
 
-@app.post("/generate-website")
-def generate_website(body: WebsiteRequest):
-    result = graph_app.invoke({
-        "user_request": body.request
-    })
+# ----------------------------------
+# Job API: submit, poll, stream progress
+# ----------------------------------
+@app.post("/jobs", status_code=202)
+async def submit_job(body: WebsiteRequest):
+    job = job_manager.submit(body.request, body.use_cache)
 
     return {
-    "plan": result["plan"],
-    "files": result["files"],
-    "review": result["review"],
-    "score": result["score"]
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
     }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "cached": job.cached,
+        "result": job.result,
+        "error": job.error
+    }
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events: started, seeded (a similar cached plan is
+    reused as a starting point), plan, candidates (scores of the
+    parallel first pass when BEST_OF_N > 1), code (per coder iteration),
+    validation (local check failures sent back to the coder without a
+    review), review (per review score), then done or error.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for event in job.follow():
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# ----------------------------------
+# One-shot endpoint (waits for the result)
+# ----------------------------------
+@app.post("/generate-website")
+async def generate_website(body: WebsiteRequest):
+    job = job_manager.submit(body.request, body.use_cache)
+    await job.task
+
+    if job.error:
+        raise HTTPException(status_code=500, detail=job.error)
+
+    return job.result
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    if artifact_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **artifact_store.stats()}
@@ -1,8 +1,18 @@
-from typing import TypedDict, Dict
+from typing import TypedDict, Dict, List
 
 class AgentState(TypedDict):
     user_request: str
     plan: str
+    seed_plan: str
     files: Dict[str, str]
     review: str
     score: int
+    iteration: int
+    changed_files: List[str]
+    usage: List[dict]
+    candidates: List[dict]
+    chosen_candidate: int
+    validation_errors: List[str]
+    validation_failures: int
+    unreviewed_files: List[str]
+    reviews_skipped: int
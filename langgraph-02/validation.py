@@ -0,0 +1,130 @@
+import posixpath
+import re
+from html.parser import HTMLParser
+from typing import Dict, List
+
+# ----------------------------------
+# Local static checks on coder output
+# ----------------------------------
+# Cheap parser/lint-style checks that run before the architect review,
+# so plainly broken output goes straight back to the coder instead of
+# spending a review call.
+
+REQUIRED_FILES = ("index.html", "src/main.tsx", "src/App.tsx", "src/index.css")
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+
+IMPORT_RE = re.compile(r"""^\s*import\s+(?:[^'";]*?\s+from\s+)?['"]([^'"]+)['"]""", re.M)
+DEFAULT_EXPORT_RE = re.compile(r"^\s*export\s+default\b", re.M)
+SOURCE_EXTENSIONS = ("", ".tsx", ".ts", ".jsx", ".js")
+
+
+class _TagChecker(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.errors = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, self.getpos()[0]))
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if not self.stack or self.stack[-1][0] != tag:
+            expected = self.stack[-1][0] if self.stack else "nothing"
+            self.errors.append(
+                f"index.html line {self.getpos()[0]}: </{tag}> closes {expected}"
+            )
+            # Recover if the tag is open further down the stack
+            for i in range(len(self.stack) - 1, -1, -1):
+                if self.stack[i][0] == tag:
+                    del self.stack[i:]
+                    break
+            return
+        self.stack.pop()
+
+
+def check_html(content: str) -> List[str]:
+    checker = _TagChecker()
+    checker.feed(content)
+    checker.close()
+
+    errors = checker.errors
+    for tag, line in checker.stack:
+        errors.append(f"index.html line {line}: <{tag}> is never closed")
+
+    if 'id="root"' not in content and "id='root'" not in content:
+        errors.append('index.html: missing the <div id="root"> mount point')
+    if "/src/main.tsx" not in content:
+        errors.append("index.html: missing <script type=\"module\" src=\"/src/main.tsx\">")
+    return errors
+
+
+def _strip_css(content: str) -> str:
+    content = re.sub(r"/\*.*?\*/", "", content, flags=re.S)
+    return re.sub(r"""(["'])(?:\\.|(?!\1).)*\1""", '""', content)
+
+
+def check_css(path: str, content: str) -> List[str]:
+    errors = []
+    depth = 0
+    for number, line in enumerate(_strip_css(content).splitlines(), start=1):
+        for char in line:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth < 0:
+                    errors.append(f"{path} line {number}: unexpected '}}'")
+                    depth = 0
+
+    if depth > 0:
+        errors.append(f"{path}: {depth} unclosed '{{'")
+    if "/*" in content and content.count("/*") != content.count("*/"):
+        errors.append(f"{path}: unterminated comment")
+    return errors
+
+
+def _resolve_import(path: str, target: str, files: Dict[str, str]) -> bool:
+    resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+    if target.startswith("/"):
+        resolved = target.lstrip("/")
+    return any(resolved + ext in files for ext in SOURCE_EXTENSIONS)
+
+
+def check_imports(path: str, content: str, files: Dict[str, str]) -> List[str]:
+    errors = []
+    for target in IMPORT_RE.findall(content):
+        # Bare specifiers ("react", "react-dom/client") are packages
+        if not target.startswith((".", "/")):
+            continue
+        if not _resolve_import(path, target, files):
+            errors.append(f"{path}: imports {target}, which is not one of the generated files")
+    return errors
+
+
+def validate_files(files: Dict[str, str]) -> List[str]:
+    """Returns a list of concrete problems; empty means the files pass."""
+    errors = [f"missing file: {path}" for path in REQUIRED_FILES if path not in files]
+
+    for path, content in files.items():
+        if path.endswith(".html"):
+            errors += check_html(content)
+        elif path.endswith(".css"):
+            errors += check_css(path, content)
+        elif path.endswith((".tsx", ".ts")):
+            errors += check_imports(path, content, files)
+
+    app = files.get("src/App.tsx")
+    if app is not None and not DEFAULT_EXPORT_RE.search(app):
+        errors.append("src/App.tsx: missing a default export (main.tsx imports App as default)")
+
+    return errors
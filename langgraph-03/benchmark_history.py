@@ -0,0 +1,100 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import db
+
+# ----------------------------------
+# History load benchmark
+# ----------------------------------
+# Seeds threads of growing length and times one turn's history read:
+# load_history (whole thread), load_recent from MongoDB (cold cache)
+# and load_recent from the history cache (steady state).
+#
+#   python benchmark_history.py                  # local MongoDB (MONGO_URI)
+#   python benchmark_history.py --mongomock      # in-memory, no server
+#
+# mongomock has no real indexes and filters in Python, so it shows the
+# projection/limit savings but still scans; the constant per-turn cost
+# of load_recent shows on a real server (see docs examined).
+
+
+def seed_thread(thread_id: str, count: int):
+    start = datetime.utcnow() - timedelta(seconds=count)
+    docs = [
+        {
+            "thread_id": thread_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i} " + "lorem ipsum dolor sit amet " * 8,
+            "timestamp": start + timedelta(seconds=i),
+            "seq": i + 1,
+        }
+        for i in range(count)
+    ]
+    for i in range(0, count, 1000):
+        db.collection.insert_many(docs[i:i + 1000])
+
+
+def time_ms(fn, turns: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    return (time.perf_counter() - started_at) * 1000 / turns
+
+
+def docs_examined(thread_id: str):
+    # Explains the queries _load_window runs on a cache miss
+    limit = db.history_cache.max_messages
+    try:
+        plans = [db._window_query(thread_id, limit).explain()]
+        returned = plans[0].get("executionStats", {}).get("nReturned", 0)
+        if returned < limit:
+            plans.append(db._legacy_window_query(thread_id, limit - returned).explain())
+    except (AttributeError, NotImplementedError):
+        # mongomock cursors cannot explain
+        return None
+    return sum(plan.get("executionStats", {}).get("totalDocsExamined", 0) for plan in plans)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongomock", action="store_true")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--window", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        db.collection = mongomock.MongoClient()["chat_db"]["chat_history"]
+    else:
+        db.collection = db.client["chat_bench"]["chat_history"]
+        db.collection.drop()
+
+    db.ensure_indexes()
+
+    print(f"{'messages':>9} {'load_history ms':>16} {'load_recent ms':>15} "
+          f"{'cached ms':>10} {'docs examined':>14}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        thread_id = f"bench-{size}"
+        seed_thread(thread_id, size)
+
+        full = time_ms(lambda: db.load_history(thread_id), args.turns)
+
+        def cold_recent():
+            db.history_cache.invalidate(thread_id)
+            db.load_recent(thread_id, args.window)
+
+        recent = time_ms(cold_recent, args.turns)
+        cached = time_ms(lambda: db.load_recent(thread_id, args.window), args.turns)
+        examined = docs_examined(thread_id)
+
+        print(f"{size:>9} {full:>16.2f} {recent:>15.2f} {cached:>10.3f} "
+              f"{examined if examined is not None else '-':>14}")
+
+    if not args.mongomock:
+        db.collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import db
+
+# ----------------------------------
+# Message write benchmark
+# ----------------------------------
+# Many chat threads saving messages at once: a synchronous insert_one
+# per message vs save_message through the batched background writer.
+# Reports the latency a turn waits for and the overall throughput.
+#
+#   python benchmark_writes.py                  # local MongoDB (MONGO_URI)
+#   python benchmark_writes.py --mongomock      # in-memory, no server
+
+
+def insert_one(thread_id: str, seq: int):
+    db.collection.insert_one({
+        "thread_id": thread_id,
+        "seq": seq,
+        "role": "user",
+        "content": f"message {seq}",
+        "timestamp": datetime.utcnow()
+    })
+
+
+def batched(thread_id: str, seq: int):
+    db.save_message(thread_id, "user", f"message {seq}")
+
+
+def run(save, threads: int, messages: int, prefix: str):
+    def chat(thread_index: int):
+        thread_id = f"{prefix}-{thread_index}"
+        latencies = []
+        for seq in range(1, messages + 1):
+            started_at = time.perf_counter()
+            save(thread_id, seq)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        return latencies
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = [ms for result in pool.map(chat, range(threads)) for ms in result]
+    db.message_writer.flush()
+    wall_seconds = time.perf_counter() - started_at
+
+    latencies.sort()
+    return (
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99) - 1],
+        len(latencies) / wall_seconds,
+    )
+
+
+def use_fresh_collection(mongomock: bool):
+    # Each mode starts from an empty collection
+    if mongomock:
+        import mongomock as mongomock_module
+        db.collection = mongomock_module.MongoClient()["chat_db"]["chat_history"]
+    else:
+        db.collection = db.client["chat_bench"]["chat_history"]
+        db.collection.drop()
+
+    db.message_writer.collection = db.collection
+    db.history_cache = type(db.history_cache)(
+        db.history_cache.max_threads, db.history_cache.max_messages
+    )
+    db.ensure_indexes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongomock", action="store_true")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.messages} messages")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p99 ms':>8} {'msgs/s':>9}")
+    for mode, save in (("insert_one", insert_one), ("batched", batched)):
+        use_fresh_collection(args.mongomock)
+        p50, p99, throughput = run(save, args.threads, args.messages, mode)
+        print(f"{mode:<12} {p50:>8.3f} {p99:>8.3f} {throughput:>9.0f}")
+
+    print(db.message_writer.stats())
+
+    if not args.mongomock:
+        db.collection.drop()
+
+
+if __name__ == "__main__":
+    main()
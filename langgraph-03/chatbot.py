@@ -1,10 +1,16 @@
+import asyncio
+import os
+
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
 from state import ChatState
-from db import save_message, load_history
+from db import (
+    ensure_indexes, estimate_tokens, fit_tokens, history_cache, save_message,
+    load_recent, load_summary, save_summary,
+)
 
 # ----------------------------------
 # Setup
@@ -15,62 +21,186 @@ llm = ChatOpenAI(
     model="gpt-4o-mini"
 )
 
+# History window sent with each turn (newest messages first to fit)
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "50"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "4000"))
+
+# Once the summary plus unsummarized history passes this many tokens
+# (or the history outgrows the window), older turns are folded into the
+# summary and up to the last KEEP_TURNS (user + assistant pairs) stay
+# verbatim. Both are capped to the window so nothing is cut from the
+# prompt before it has been summarized
+COMPACT_TRIGGER_TOKENS = min(int(os.getenv("COMPACT_TRIGGER_TOKENS", "3000")), HISTORY_MAX_TOKENS)
+KEEP_TURNS = min(int(os.getenv("KEEP_TURNS", "6")), (HISTORY_MAX_MESSAGES - 1) // 2)
+
+SUMMARY_PROMPT = """Update the running summary of a conversation.
+
+Keep facts, names, decisions, preferences and open questions the
+assistant will need later. Drop small talk. Reply with the summary only.
+
+Current summary:
+{summary}
+
+New messages to fold in:
+{messages}
+"""
+
+
+def to_messages(history: list):
+    messages = []
+    for msg in history:
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        else:
+            messages.append(AIMessage(content=msg["content"]))
+    return messages
+
 # ----------------------------------
-# LangGraph node
+# LangGraph nodes
 # ----------------------------------
-def chat_node(state: ChatState):
-    response = llm.invoke(state["messages"])
+async def compact_node(state: ChatState):
+    summary = state.get("summary", "")
+    summary_seq = state.get("summary_seq", 0)
+    history = state["history"]
+
+    keep = KEEP_TURNS * 2 + 1   # plus the current user message
+    size = estimate_tokens(summary) + sum(estimate_tokens(m["content"]) for m in history)
+
+    # The turns kept verbatim take at most half the trigger, so a few
+    # turns pass before the next compaction
+    recent = fit_tokens(history[-keep:], COMPACT_TRIGGER_TOKENS // 2)
+    older = history[:len(history) - len(recent)]
+    through_seq = max((m["seq"] for m in older), default=0)
+
+    # Messages saved before sequence numbers existed cannot be marked
+    # as summarized, so they are never compacted
+    over_window = size > COMPACT_TRIGGER_TOKENS or len(history) > HISTORY_MAX_MESSAGES
+    if over_window and through_seq > summary_seq:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in older)
+        response = await llm.ainvoke(SUMMARY_PROMPT.format(
+            summary=summary or "(none)",
+            messages=transcript
+        ))
+
+        summary = response.content
+        summary_seq = through_seq
+        history = recent
+        await asyncio.to_thread(save_summary, state["thread_id"], summary, summary_seq)
+
+    # Only legacy messages can still be over the window here
+    history = fit_tokens(history[-HISTORY_MAX_MESSAGES:], HISTORY_MAX_TOKENS)
+
+    messages = to_messages(history)
+    if summary:
+        messages.insert(0, SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+
+    return {
+        "summary": summary,
+        "summary_seq": summary_seq,
+        "history": history,
+        "messages": messages
+    }
+
+
+async def chat_node(state: ChatState):
+    response = await llm.ainvoke(state["messages"])
+
+    usage = response.usage_metadata or {}
+    prompt_tokens = usage.get("input_tokens") or sum(
+        estimate_tokens(str(m.content)) for m in state["messages"]
+    )
+
     return {
-        "messages": state["messages"] + [response]
+        "messages": state["messages"] + [response],
+        "prompt_tokens": prompt_tokens
     }
 
 # ----------------------------------
 # Build LangGraph
 # ----------------------------------
 graph = StateGraph(ChatState)
+graph.add_node("compact", compact_node)
 graph.add_node("chat", chat_node)
-graph.set_entry_point("chat")
+graph.set_entry_point("compact")
+graph.add_edge("compact", "chat")
 graph.add_edge("chat", END)
 
 app = graph.compile()
 
+# ----------------------------------
+# One chat turn
+# ----------------------------------
+def start_turn(thread_id: str, user_input: str):
+    # Load the summary and everything after it that the cache holds;
+    # compact_node trims to the window once older turns are summarized
+    summary = load_summary(thread_id) or {"summary": "", "through_seq": 0}
+    history = load_recent(
+        thread_id,
+        history_cache.max_messages,
+        after_seq=summary["through_seq"]
+    )
+
+    # Add current user message
+    seq = save_message(thread_id, "user", user_input)
+    history.append({"role": "user", "content": user_input, "seq": seq})
+
+    return {
+        "thread_id": thread_id,
+        "history": history,
+        "summary": summary["summary"],
+        "summary_seq": summary["through_seq"]
+    }
+
+
+async def chat_turn(thread_id: str, user_input: str):
+    """
+    Runs one turn and returns the final graph state. Callers must not
+    run two turns of the same thread at once (see server.py).
+    """
+    # History usually comes from the cache, but a cold thread reads MongoDB
+    inputs = await asyncio.to_thread(start_turn, thread_id, user_input)
+
+    # Invoke LangGraph
+    result = await app.ainvoke(inputs)
+
+    # Saving can reload a cold window from MongoDB, so keep it off the loop
+    await asyncio.to_thread(save_message, thread_id, "assistant", result["messages"][-1].content)
+    return result
+
 # ----------------------------------
 # Chat runner
 # ----------------------------------
-def run_chat():
+async def run_chat():
     thread_id = "user-1"
 
+    ensure_indexes()
+
     print("Chat started (type 'exit' to quit)\n")
 
+    turns = 0
+    total_prompt_tokens = 0
+
     while True:
-        user_input = input("You: ")
+        user_input = await asyncio.to_thread(input, "You: ")
         if user_input.lower() == "exit":
             break
 
-        # Load chat history from MongoDB
-        history = load_history(thread_id)
-
-        messages = []
-        for msg in history:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            else:
-                messages.append(AIMessage(content=msg["content"]))
-
-        # Add current user message
-        messages.append(HumanMessage(content=user_input))
-        save_message(thread_id, "user", user_input)
-
-        # Invoke LangGraph
-        result = app.invoke({"messages": messages})
+        result = await chat_turn(thread_id, user_input)
 
         ai_reply = result["messages"][-1].content
         print("Bot:", ai_reply)
 
-        save_message(thread_id, "assistant", ai_reply)
+        # Tokens sent per turn stay flat once compaction kicks in
+        turns += 1
+        total_prompt_tokens += result["prompt_tokens"]
+        print(
+            f"  [prompt tokens {result['prompt_tokens']}, "
+            f"avg {total_prompt_tokens // turns}, "
+            f"messages sent {len(result['messages']) - 1}]"
+        )
 
 # ----------------------------------
 # Entry point
 # ----------------------------------
 if __name__ == "__main__":
-    run_chat()
+    asyncio.run(run_chat())
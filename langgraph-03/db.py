@@ -1,41 +1,190 @@
-from pymongo import MongoClient
+import atexit
+import os
+from pymongo import ASCENDING, DESCENDING, MongoClient
 from datetime import datetime
 
+from history_cache import HistoryCache
+from message_writer import MessageWriter
+
 # ----------------------------------
 # MongoDB connection
 # ----------------------------------
-client = MongoClient("mongodb://localhost:27017")
+# One pooled client per process, shared by every thread and request
+client = MongoClient(
+    os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+)
 db = client["chat_db"]
 collection = db["chat_history"]
+summaries = db["chat_summaries"]
+
+# Only what the chat needs; skips _id, thread_id and timestamp
+CACHE_PROJECTION = {"_id": 0, "role": 1, "content": 1, "seq": 1}
+
+# Newest messages of recently active threads, kept in process
+history_cache = HistoryCache(
+    max_threads=int(os.getenv("HISTORY_CACHE_THREADS", "1000")),
+    max_messages=int(os.getenv("HISTORY_CACHE_MESSAGES", "200"))
+)
+
+
+# ----------------------------------
+# Indexes (call once at startup)
+# ----------------------------------
+def ensure_indexes():
+    # Serves both the thread filter and the (timestamp, seq) sort, in
+    # either direction, so history reads never scan other threads
+    collection.create_index(
+        [("thread_id", ASCENDING), ("timestamp", ASCENDING), ("seq", ASCENDING)],
+        name="thread_id_timestamp_seq"
+    )
+
+    # One writer per sequence number; messages saved before sequence
+    # numbers existed have no seq and are left out
+    collection.create_index(
+        [("thread_id", ASCENDING), ("seq", ASCENDING)],
+        name="thread_id_seq",
+        unique=True,
+        partialFilterExpression={"seq": {"$exists": True}}
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def fit_tokens(messages: list, max_tokens: int = None):
+    # Keeps the newest messages that fit; always at least one
+    if max_tokens is None:
+        return list(messages)
+
+    window = []
+    used_tokens = 0
+
+    for message in reversed(messages):
+        tokens = estimate_tokens(message["content"])
+        if window and used_tokens + tokens > max_tokens:
+            break
+
+        used_tokens += tokens
+        window.append(message)
+
+    window.reverse()
+    return window
+
+
+def _window_query(thread_id: str, limit: int):
+    # Sequence order is exact; timestamps can tie within a millisecond
+    return (
+        collection.find({"thread_id": thread_id, "seq": {"$exists": True}}, CACHE_PROJECTION)
+        .sort("seq", DESCENDING)
+        .limit(limit)
+    )
+
+def _legacy_window_query(thread_id: str, limit: int):
+    # Older messages saved before sequence numbers existed
+    return (
+        collection.find({"thread_id": thread_id, "seq": {"$exists": False}}, CACHE_PROJECTION)
+        .sort("timestamp", DESCENDING)
+        .limit(limit)
+    )
+
+def _merge_queued(docs: list, queued: list) -> list:
+    # Messages still queued for the writer are newer than what is stored
+    stored = {doc.get("seq") for doc in docs}
+    return docs + [doc for doc in queued if doc["seq"] not in stored]
+
+def _load_window(thread_id: str):
+    # Fills the cache with the newest messages and the last sequence number
+    limit = history_cache.max_messages
+
+    # Taken before the read: anything written meanwhile shows up in it
+    queued = message_writer.pending(thread_id)
+
+    docs = list(_window_query(thread_id, limit))
+    if len(docs) < limit:
+        docs += list(_legacy_window_query(thread_id, limit - len(docs)))
+
+    docs.reverse()
+    complete = len(docs) < limit
+    docs = _merge_queued(docs, queued)
+
+    return history_cache.put(
+        thread_id,
+        [{"role": doc["role"], "content": doc["content"], "seq": doc.get("seq", 0)} for doc in docs],
+        max((doc.get("seq", 0) for doc in docs), default=0),
+        complete=complete
+    )
+
+def _next_seq(thread_id: str, role: str, content: str):
+    # Loading the window sets the thread's last sequence number
+    while True:
+        seq = history_cache.add(thread_id, role, content)
+        if seq is not None:
+            return seq
+        _load_window(thread_id)
+
+
+def _resequence(docs: list):
+    # Another process used these sequence numbers: reload the thread and
+    # number this process's unwritten messages again after what is now
+    # stored, keeping their order
+    thread_id = docs[0]["thread_id"]
+    history_cache.invalidate(thread_id)
+    for doc in docs:
+        doc["seq"] = _next_seq(thread_id, doc["role"], doc["content"])
+        doc["timestamp"] = datetime.utcnow()
+
+
+message_writer = MessageWriter(
+    collection,
+    on_conflict=_resequence,
+    batch_size=int(os.getenv("WRITE_BATCH_SIZE", "500"))
+)
+
+# Whatever is still queued is written before the process exits
+atexit.register(message_writer.stop)
 
 # ----------------------------------
 # Save a single message
 # ----------------------------------
 def save_message(thread_id: str, role: str, content: str):
-    collection.insert_one({
+    """
+    Assigns the message its sequence number, adds it to the history
+    cache and queues the write; returns the sequence number without
+    waiting for MongoDB.
+    """
+    doc = {
         "thread_id": thread_id,
+        "seq": _next_seq(thread_id, role, content),
         "role": role,
         "content": content,
         "timestamp": datetime.utcnow()
-    })
+    }
+    message_writer.submit(doc)
+    return doc["seq"]
 
 # ----------------------------------
 # Load full chat history
 # ----------------------------------
 def load_history(thread_id: str):
-    # Step 1: Query MongoDB for all messages of this thread
+    # Step 1: Query MongoDB for all messages of this thread (saves still
+    # queued for the writer are added in step 3)
+    queued = message_writer.pending(thread_id)
     cursor = collection.find(
-        {"thread_id": thread_id}
+        {"thread_id": thread_id},
+        CACHE_PROJECTION
     )
 
-    # Step 2: Sort messages by time (oldest → newest)
-    cursor = cursor.sort("timestamp", 1)
+    # Step 2: Sort messages by time (oldest → newest), ties by sequence
+    cursor = cursor.sort([("timestamp", ASCENDING), ("seq", ASCENDING)])
 
     # Step 3: Prepare a list to store cleaned messages
     history = []
 
     # Step 4: Iterate over each document from MongoDB
-    for doc in cursor:
+    for doc in _merge_queued(list(cursor), queued):
         message = {
             "role": doc["role"],
             "content": doc["content"]
@@ -44,3 +193,78 @@ def load_history(thread_id: str):
 
     # Step 5: Return the full conversation history
     return history
+
+# ----------------------------------
+# Load the newest window of a thread
+# ----------------------------------
+def load_recent(
+    thread_id: str,
+    max_messages: int = 50,
+    max_tokens: int = None,
+    after_seq: int = 0
+):
+    """
+    Returns at most `max_messages` of the newest messages (oldest →
+    newest) with a sequence number above `after_seq` (messages already
+    folded into the thread summary are skipped), trimmed further to fit
+    `max_tokens` if given. Each message has role, content and seq. Served from
+    the history cache when the window fits in it; otherwise reads walk
+    the index backwards from the newest message, so the cost depends on
+    the window size, not on how long the thread is.
+    """
+    if max_messages <= history_cache.max_messages:
+        entry = history_cache.get(thread_id) or _load_window(thread_id)
+        messages = [m for m in entry.messages[-max_messages:] if m["seq"] > after_seq]
+        return fit_tokens(messages, max_tokens)
+
+    query = {"thread_id": thread_id}
+    if after_seq:
+        query["seq"] = {"$gt": after_seq}
+
+    queued = [doc for doc in message_writer.pending(thread_id) if doc["seq"] > after_seq]
+    cursor = collection.find(
+        query,
+        CACHE_PROJECTION
+    ).sort([("timestamp", DESCENDING), ("seq", DESCENDING)]).limit(max_messages)
+
+    docs = list(cursor)
+    docs.reverse()
+
+    messages = [
+        {"role": doc["role"], "content": doc["content"], "seq": doc.get("seq", 0)}
+        for doc in _merge_queued(docs, queued)[-max_messages:]
+    ]
+    return fit_tokens(messages, max_tokens)
+
+# ----------------------------------
+# Rolling thread summary
+# ----------------------------------
+def load_summary(thread_id: str):
+    """
+    Returns {"summary": str, "through_seq": int} for the thread, or None
+    if it was never compacted. Cached alongside the thread's history.
+    """
+    entry = history_cache.get(thread_id) or _load_window(thread_id)
+    if not entry.summary_loaded:
+        entry.summary = summaries.find_one(
+            {"_id": thread_id}, {"_id": 0, "summary": 1, "through_seq": 1}
+        )
+        entry.summary_loaded = True
+    return entry.summary
+
+
+def save_summary(thread_id: str, summary: str, through_seq: int):
+    summaries.update_one(
+        {"_id": thread_id},
+        {"$set": {
+            "summary": summary,
+            "through_seq": through_seq,
+            "updated_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+    entry = history_cache.get(thread_id)
+    if entry is not None:
+        entry.summary = {"summary": summary, "through_seq": through_seq}
+        entry.summary_loaded = True
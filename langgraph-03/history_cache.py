@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+# ----------------------------------
+# Write-through conversation cache
+# ----------------------------------
+# The newest messages of recently active threads, kept in process so a
+# turn does not re-read what this process wrote moments ago. The cache
+# also hands out each thread's next sequence number; if another
+# process already used it, the write is rejected by MongoDB and the
+# thread is dropped so the next read reloads it.
+
+
+class ThreadHistory:
+    def __init__(self, messages: list, last_seq: int, complete: bool):
+        self.messages = messages      # oldest → newest
+        self.last_seq = last_seq
+        self.complete = complete      # True if this is the whole thread
+
+        # Rolling summary document; None until read from MongoDB
+        self.summary = None
+        self.summary_loaded = False
+
+
+class HistoryCache:
+    def __init__(self, max_threads: int = 1000, max_messages: int = 200):
+        self.max_threads = max_threads
+        self.max_messages = max_messages
+
+        self._threads = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reconciles = 0
+
+    def get(self, thread_id: str):
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._threads.move_to_end(thread_id)
+            self.hits += 1
+            return entry
+
+    def put(self, thread_id: str, messages: list, last_seq: int, complete: bool):
+        entry = ThreadHistory(
+            messages[-self.max_messages:],
+            last_seq,
+            complete and len(messages) <= self.max_messages,
+        )
+
+        with self._lock:
+            self._threads[thread_id] = entry
+            self._threads.move_to_end(thread_id)
+
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+                self.evictions += 1
+
+        return entry
+
+    def add(self, thread_id: str, role: str, content: str):
+        """
+        Appends a new message with the next sequence number and returns
+        it, or None if the thread is not cached (load it first).
+        """
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                return None
+
+            seq = entry.last_seq + 1
+            entry.messages.append({"role": role, "content": content, "seq": seq})
+            entry.last_seq = seq
+            if len(entry.messages) > self.max_messages:
+                del entry.messages[0]
+                entry.complete = False
+            return seq
+
+    def invalidate(self, thread_id: str):
+        with self._lock:
+            if self._threads.pop(thread_id, None) is not None:
+                self.reconciles += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "threads": len(self._threads),
+            "max_threads": self.max_threads,
+            "max_messages": self.max_messages,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "reconciles": self.reconciles,
+        }
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+# ----------------------------------
+# Concurrent session load test
+# ----------------------------------
+# Many chat threads talking to server.py at once, each sending its
+# turns back to back. Reports turns/s and latency per concurrency
+# level, to show how the server scales with concurrent sessions.
+#
+#   python load_test.py --stub                  # in-process, no keys, no MongoDB
+#   python load_test.py --url http://localhost:8000
+#
+# --stub swaps the LLM for one that waits --llm-ms and echoes, and
+# MongoDB for mongomock, then drives the app over ASGI.
+
+
+def install_stub(llm_ms: float):
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    import mongomock
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    import db
+    import chatbot
+
+    class StubChatModel(BaseChatModel):
+        delay: float
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            raise NotImplementedError("the server only calls the async API")
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(self.delay)
+            message = AIMessage(content=f"echo: {messages[-1].content}")
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    chatbot.llm = StubChatModel(delay=llm_ms / 1000)
+
+    mock = mongomock.MongoClient()["chat_db"]
+    db.collection = db.message_writer.collection = mock["chat_history"]
+    db.summaries = mock["chat_summaries"]
+    db.ensure_indexes()
+
+
+async def session(client: httpx.AsyncClient, thread_id: str, turns: int, latencies: list):
+    for turn in range(turns):
+        started_at = time.perf_counter()
+        response = await client.post(
+            f"/threads/{thread_id}/messages",
+            json={"content": f"message {turn} from {thread_id}"}
+        )
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+
+async def run_level(client: httpx.AsyncClient, sessions: int, turns: int, run: int):
+    latencies = []
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        session(client, f"load-{run}-{i}", turns, latencies)
+        for i in range(sessions)
+    ))
+    wall_seconds = time.perf_counter() - started_at
+
+    latencies.sort()
+    return (
+        len(latencies) / wall_seconds,
+        statistics.median(latencies),
+        latencies[max(0, int(len(latencies) * 0.99) - 1)],
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--stub", action="store_true")
+    target.add_argument("--url")
+    parser.add_argument("--sessions", default="1,10,50,200")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--llm-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    if args.stub:
+        install_stub(args.llm_ms)
+        from server import app
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://server", timeout=None)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+
+    print(f"{'sessions':>9} {'turns/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    async with client:
+        for run, sessions in enumerate(int(n) for n in args.sessions.split(",")):
+            throughput, p50, p99 = await run_level(client, sessions, args.turns, run)
+            print(f"{sessions:>9} {throughput:>9.1f} {p50:>8.0f} {p99:>8.0f}")
+
+        if args.url:
+            print((await client.get("/stats")).json())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+import queue
+import threading
+import time
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+# ----------------------------------
+# Background batched writer
+# ----------------------------------
+# save_message hands documents to this writer and returns immediately;
+# a single thread groups whatever has queued up into one unordered
+# insert_many, so persistence is off the chat's latency path and many
+# concurrent threads share round trips. Documents are kept per thread
+# until written, so reads can include them. A duplicate sequence number
+# (another process wrote to the same thread) hands every unwritten
+# message of that thread from there on, in order, to `on_conflict` to
+# be numbered again; other failures are retried with backoff.
+
+DUPLICATE_KEY = 11000
+
+
+class MessageWriter:
+    def __init__(
+        self,
+        collection,
+        on_conflict=None,
+        batch_size: int = 500,
+        linger_seconds: float = 0.01,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 0.5,
+    ):
+        self.collection = collection
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        self._queue = queue.Queue()
+        self._pending = {}                 # thread_id → unwritten docs, oldest first
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        self.written = 0
+        self.batches = 0
+        self.conflicts = 0
+        self.failed = 0
+
+    # ----------------------------------
+    # Request path
+    # ----------------------------------
+    def submit(self, doc: dict):
+        self.start()
+        with self._lock:
+            self._pending.setdefault(doc["thread_id"], []).append(doc)
+            self._queue.put(doc)
+
+    def pending(self, thread_id: str) -> list:
+        """Messages of the thread submitted but not yet written, oldest first."""
+        with self._lock:
+            return list(self._pending.get(thread_id, []))
+
+    def flush(self, timeout: float = None):
+        """Blocks until everything submitted so far is written."""
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
+
+    # ----------------------------------
+    # Background thread
+    # ----------------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="message-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Writes what is queued, then stops the thread."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._stopping.clear()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            # Give concurrent turns a moment to join this round trip
+            deadline = time.monotonic() + self.linger_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, remaining)))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write(batch)
+            finally:
+                self._forget(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: list):
+        pending = batch
+        in_batch = {id(doc) for doc in batch}
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.collection.insert_many(pending, ordered=False)
+                self.written += len(pending)
+                self.batches += 1
+                return
+
+            except BulkWriteError as exc:
+                failed = {error["index"]: error for error in exc.details["writeErrors"]}
+                self.written += len(pending) - len(failed)
+                self.batches += 1
+
+                retry = []
+                conflicts = {}
+                for index, error in failed.items():
+                    doc = pending[index]
+                    if error["code"] == DUPLICATE_KEY and "_id" in error.get("keyPattern", {}):
+                        # Landed on an earlier attempt whose reply was lost
+                        self.written += 1
+                    elif error["code"] == DUPLICATE_KEY and self.on_conflict is not None:
+                        self.conflicts += 1
+                        thread_id = doc["thread_id"]
+                        conflicts[thread_id] = min(doc["seq"], conflicts.get(thread_id, doc["seq"]))
+                    else:
+                        retry.append(doc)
+
+                for thread_id, seq in conflicts.items():
+                    moved = self._resequence(thread_id, seq)
+                    moved_ids = {id(doc) for doc in moved}
+                    # Queued ones keep their place in the queue
+                    retry = [doc for doc in retry if id(doc) not in moved_ids]
+                    retry += [doc for doc in moved if id(doc) in in_batch]
+
+                if not retry:
+                    return
+                pending = retry
+
+            except PyMongoError as exc:
+                print(f"Message write failed (attempt {attempt}): {exc!r}")
+
+            # insert_many set _id on every document; reuse them so a
+            # retried batch cannot insert a message twice
+            time.sleep(self.retry_base_seconds * (2 ** (attempt - 1)))
+
+        self.failed += len(pending)
+        print(f"Dropped {len(pending)} messages after {self.max_attempts} attempts")
+
+    def _resequence(self, thread_id: str, from_seq: int) -> list:
+        """
+        Takes every unwritten message of the thread from `from_seq` on,
+        plus any this batch already wrote after it (deleted again), and
+        has `on_conflict` number them again in their original order.
+        """
+        with self._lock:
+            pending = self._pending.get(thread_id, [])
+            docs = [doc for doc in pending if doc["seq"] >= from_seq]
+            # Out of pending while renumbered, so reloads skip the old numbers
+            self._pending[thread_id] = [doc for doc in pending if doc["seq"] < from_seq]
+
+            try:
+                ids = [doc["_id"] for doc in docs if "_id" in doc]
+                if ids:
+                    self.written -= self.collection.delete_many({"_id": {"$in": ids}}).deleted_count
+                self.on_conflict(docs)
+            except PyMongoError as exc:
+                # Retried as they are; the next conflict tries again
+                print(f"Resequencing {thread_id} failed: {exc!r}")
+            finally:
+                self._pending[thread_id] += docs
+
+        return docs
+
+    def _forget(self, batch: list):
+        done = {id(doc) for doc in batch}
+        with self._lock:
+            for thread_id in {doc["thread_id"] for doc in batch}:
+                left = [doc for doc in self._pending.get(thread_id, []) if id(doc) not in done]
+                if left:
+                    self._pending[thread_id] = left
+                else:
+                    self._pending.pop(thread_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "conflicts": self.conflicts,
+            "failed": self.failed,
+        }
@@ -0,0 +1,101 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
+
+import db
+from chatbot import chat_turn, HISTORY_MAX_MESSAGES
+
+# ----------------------------------
+# Multi-user chat server
+# ----------------------------------
+# Hosts the compiled graph for any number of threads at once. Turns of
+# different threads run concurrently; turns of the same thread run one
+# at a time, in arrival order, whether they come over HTTP or a
+# WebSocket. All requests share db.py's pooled MongoClient.
+#
+#   uvicorn server:app --host 0.0.0.0 --port 8000
+#
+#   POST /threads/{thread_id}/messages   {"content": "..."}
+#   GET  /threads/{thread_id}/messages
+#   WS   /threads/{thread_id}/ws         send {"content": "..."}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(db.ensure_indexes)
+    yield
+    # Write whatever is still queued before the process exits
+    await asyncio.to_thread(db.message_writer.stop)
+
+
+app = FastAPI(title="LangGraph Chat Server", lifespan=lifespan)
+
+# asyncio.Lock is FIFO, so waiting turns keep their arrival order.
+# Locks disappear once no turn of their thread is running or waiting.
+thread_locks = weakref.WeakValueDictionary()
+
+active_turns = 0
+
+
+def thread_lock(thread_id: str) -> asyncio.Lock:
+    lock = thread_locks.get(thread_id)
+    if lock is None:
+        lock = thread_locks[thread_id] = asyncio.Lock()
+    return lock
+
+
+async def run_turn(thread_id: str, content: str) -> dict:
+    global active_turns
+
+    lock = thread_lock(thread_id)
+    async with lock:
+        active_turns += 1
+        try:
+            result = await chat_turn(thread_id, content)
+        finally:
+            active_turns -= 1
+
+    return {
+        "thread_id": thread_id,
+        "reply": result["messages"][-1].content,
+        "prompt_tokens": result["prompt_tokens"]
+    }
+
+
+class ChatMessage(BaseModel):
+    content: str
+
+
+@app.post("/threads/{thread_id}/messages")
+async def post_message(thread_id: str, body: ChatMessage):
+    return await run_turn(thread_id, body.content)
+
+
+@app.get("/threads/{thread_id}/messages")
+async def get_messages(thread_id: str, limit: int = HISTORY_MAX_MESSAGES):
+    messages = await asyncio.to_thread(db.load_recent, thread_id, limit)
+    return {"thread_id": thread_id, "messages": messages}
+
+
+@app.websocket("/threads/{thread_id}/ws")
+async def chat_socket(websocket: WebSocket, thread_id: str):
+    await websocket.accept()
+    try:
+        while True:
+            body = await websocket.receive_json()
+            await websocket.send_json(await run_turn(thread_id, body["content"]))
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "active_turns": active_turns,
+        "threads_with_turns": len(thread_locks),
+        "history_cache": db.history_cache.stats(),
+        "message_writer": db.message_writer.stats()
+    }
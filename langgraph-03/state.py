@@ -6,4 +6,9 @@ class ChatState(TypedDict):
     LangGraph runtime state.
     Exists only during execution.
     """
+    thread_id: str
+    history: list[dict]         # stored messages after the summary: role, content, seq
+    summary: str                # rolling summary of older turns ("" if none)
+    summary_seq: int            # last seq folded into the summary
     messages: list[BaseMessage]
+    prompt_tokens: int
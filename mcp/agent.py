@@ -0,0 +1,103 @@
+import asyncio
+import argparse
+import time
+from openai import AsyncOpenAI
+
+from mcp_client import MCPSessionPool
+from prompts import VIEWS
+
+# ---------------------------------------------------------
+# OpenAI Client (async, so all views run at the same time)
+# ---------------------------------------------------------
+client = AsyncOpenAI()
+
+
+# ---------------------------------------------------------
+# One LLM Call per View
+# ---------------------------------------------------------
+async def run_view(name: str, base_prompt: str, context: str, query: str):
+    started_at = time.perf_counter()
+
+    system_prompt = base_prompt + "\n" + context
+
+    response = await client.chat.completions.create(
+        model="gpt-4.1",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": query},
+        ],
+    )
+
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    return name, response.choices[0].message.content, elapsed_ms
+
+
+# ---------------------------------------------------------
+# Retrieve Once, Answer in Every View
+# ---------------------------------------------------------
+async def answer(pool: MCPSessionPool, query: str, views: list):
+    started_at = time.perf_counter()
+
+    # -----------------------------------------------------
+    # Call MCP RAG Tool (RETRIEVAL ONLY, shared by all views)
+    # -----------------------------------------------------
+    result = await pool.call_tool(
+        "rag_search",
+        {
+            "query": query
+        }
+    )
+    context = str(result.content)
+
+    # -----------------------------------------------------
+    # Fire all views concurrently, print each as it finishes
+    # -----------------------------------------------------
+    tasks = [
+        asyncio.create_task(run_view(name, VIEWS[name], context, query))
+        for name in views
+    ]
+
+    view_ms = []
+    for next_done in asyncio.as_completed(tasks):
+        name, content, elapsed_ms = await next_done
+        view_ms.append(elapsed_ms)
+
+        print(f"\n🤖 [{name}] ({elapsed_ms:.0f} ms)\n{content}")
+
+    total_ms = (time.perf_counter() - started_at) * 1000
+    print(
+        f"\n(total {total_ms:.0f} ms; slowest view {max(view_ms):.0f} ms, "
+        f"views run one after another would take {sum(view_ms):.0f} ms)\n"
+    )
+
+
+# ---------------------------------------------------------
+# Main Logic
+# ---------------------------------------------------------
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--views",
+        default=",".join(VIEWS),
+        help=f"comma-separated views to run (available: {', '.join(VIEWS)})"
+    )
+    args = parser.parse_args()
+
+    views = [name.strip() for name in args.views.split(",") if name.strip()]
+    unknown = [name for name in views if name not in VIEWS]
+    if unknown:
+        parser.error(f"unknown views: {', '.join(unknown)}")
+
+    async with MCPSessionPool() as pool:
+        print(f"Views: {', '.join(views)}. Type 'exit' to quit.\n")
+
+        while True:
+            query = (await asyncio.to_thread(input, "> ")).strip()
+            if query.lower() in {"exit", "quit"}:
+                break
+            if query:
+                await answer(pool, query, views)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,60 +1,40 @@
 import asyncio
-from openai import OpenAI
+import time
+from openai import AsyncOpenAI
 
-from mcp import ClientSession
-from mcp.client.streamable_http import streamable_http_client
+from mcp_client import MCPSessionPool
+from prompts import EXPLAIN_PROMPT
 
 # ---------------------------------------------------------
-# OpenAI Client
+# OpenAI Client (async, so the pooled MCP sessions keep running
+# on the event loop while a completion is in flight)
 # ---------------------------------------------------------
-client = OpenAI()
+client = AsyncOpenAI()
 
 # ---------------------------------------------------------
 # System Prompt (MATCHES rag.py SEMANTICS)
 # ---------------------------------------------------------
-BASE_SYSTEM_PROMPT = """
-You are a helpful AI assistant.
-
-You have been given content extracted from a PDF document.
-
-Priority is to completely use that content and add the following content:
-1. how this is used in devops
-2. famous organisations that use the technology or concept
-3. real world areas where this is used
-4. any examples if possible and relevant to user query
-
-Document Context:
-"""
+BASE_SYSTEM_PROMPT = EXPLAIN_PROMPT
 
 # ---------------------------------------------------------
-# Main Logic
+# Answer One Question (over an already-open MCP session)
 # ---------------------------------------------------------
-async def main():
-    query = input("> ")
-
+async def answer(pool: MCPSessionPool, query: str):
     # -----------------------------------------------------
-    # Connect to MCP RAG Server
+    # Call MCP RAG Tool (RETRIEVAL ONLY)
     # -----------------------------------------------------
-    async with streamable_http_client("http://localhost:8000/mcp") as (
-        read_stream,
-        write_stream,
-        _,
-    ):
-        async with ClientSession(read_stream, write_stream) as session:
-            await session.initialize()
+    started_at = time.perf_counter()
+    result = await pool.call_tool(
+        "rag_search",
+        {
+            "query": query
+        }
+    )
+    retrieval_ms = (time.perf_counter() - started_at) * 1000
 
-            # -------------------------------------------------
-            # Call MCP RAG Tool (RETRIEVAL ONLY)
-            # -------------------------------------------------
-            result = await session.call_tool(
-                "rag_search",
-                {
-                    "query": query
-                }
-            )
+    # Extract raw document text (NO formatting, NO logic)
+    retrieved_chunks = result.content
 
-            # Extract raw document text (NO formatting, NO logic)
-            retrieved_chunks = result.content
     # -----------------------------------------------------
     # Build Context (EXACTLY like rag.py)
     # -----------------------------------------------------
@@ -65,7 +45,7 @@ async def main():
     # -----------------------------------------------------
     # LLM Call
     # -----------------------------------------------------
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4.1",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -74,6 +54,29 @@ async def main():
     )
 
     print("\n🤖", response.choices[0].message.content)
+    print(f"\n(retrieval over warm MCP session: {retrieval_ms:.0f} ms)\n")
+
+
+# ---------------------------------------------------------
+# Main Logic
+# ---------------------------------------------------------
+async def main():
+    # -----------------------------------------------------
+    # Connect to MCP RAG Server once, reuse for every question
+    # -----------------------------------------------------
+    async with MCPSessionPool() as pool:
+        print(
+            f"Connected to MCP RAG server "
+            f"(handshake {pool.handshake_ms[0]:.0f} ms, paid once). "
+            f"Type 'exit' to quit.\n"
+        )
+
+        while True:
+            query = (await asyncio.to_thread(input, "> ")).strip()
+            if query.lower() in {"exit", "quit"}:
+                break
+            if query:
+                await answer(pool, query)
 
 
 if __name__ == "__main__":
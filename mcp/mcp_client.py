@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+
+# ---------------------------------------------------------
+# MCP Server Location
+# ---------------------------------------------------------
+MCP_SERVER_URL = "http://localhost:8000/mcp"
+
+
+# ---------------------------------------------------------
+# Pooled, Long-Lived MCP Sessions
+# ---------------------------------------------------------
+class MCPSessionPool:
+    """
+    Keeps `size` initialized MCP sessions open and shares them between
+    callers, so the HTTP connect + initialize handshake is paid once per
+    session instead of once per question.
+
+    Each session lives in its own task (the MCP transports must be
+    opened and closed by the same task) and pulls tool calls from a
+    shared queue. If a session's connection breaks, it reconnects and
+    then retries the call itself; the other sessions are likely just as
+    stale (e.g. after a server restart), so the call is not handed back
+    to the queue.
+
+        async with MCPSessionPool() as pool:
+            result = await pool.call_tool("rag_search", {"query": "..."})
+    """
+
+    def __init__(
+        self,
+        url: str = MCP_SERVER_URL,
+        size: int = 2,
+        max_attempts: int = 2,
+        reconnect_delay: float = 1.0,
+        connect_timeout: float = 30,
+    ):
+        self.url = url
+        self.size = size
+        self.max_attempts = max_attempts
+        self.reconnect_delay = reconnect_delay
+        self.connect_timeout = connect_timeout
+
+        self.handshake_ms = []
+        self._requests = asyncio.Queue()
+        self._ready = asyncio.Event()
+        self._tasks = []
+
+    async def __aenter__(self):
+        self._tasks = [
+            asyncio.create_task(self._run_session())
+            for _ in range(self.size)
+        ]
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            for task in self._tasks:
+                task.cancel()
+            raise ConnectionError(f"Could not reach MCP server at {self.url}")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for _ in self._tasks:
+            await self._requests.put(None)
+
+        # Sessions stuck reconnecting never see the shutdown marker
+        _, pending = await asyncio.wait(self._tasks, timeout=5)
+        for task in pending:
+            task.cancel()
+
+    async def call_tool(self, name: str, arguments: dict, timeout: float = 60):
+        future = asyncio.get_running_loop().create_future()
+        await self._requests.put((name, arguments, future, 1))
+        return await asyncio.wait_for(future, timeout)
+
+    async def _run_session(self):
+        # Calls that failed on this session, waiting for it to reconnect
+        held = []
+        try:
+            await self._connect_loop(held)
+        finally:
+            for _, _, future, _ in held:
+                if not future.done():
+                    future.set_exception(ConnectionError("MCP session pool closed"))
+
+    async def _connect_loop(self, held: list):
+        while True:
+            try:
+                async with streamable_http_client(self.url) as (
+                    read_stream,
+                    write_stream,
+                    _,
+                ):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        started_at = time.perf_counter()
+                        await session.initialize()
+                        self.handshake_ms.append(
+                            (time.perf_counter() - started_at) * 1000
+                        )
+                        self._ready.set()
+
+                        if not await self._serve(session, held):
+                            return
+            except Exception as exc:
+                print(f"MCP session lost ({exc!r}), reconnecting...")
+
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _serve(self, session, held: list) -> bool:
+        """
+        Handles held calls, then requests, until shutdown (returns False)
+        or until the connection breaks (returns True, so the caller
+        reconnects; a call with attempts left goes into `held`).
+        """
+        while True:
+            request = held.pop(0) if held else await self._requests.get()
+            if request is None:
+                return False
+
+            name, arguments, future, attempt = request
+            if future.done():
+                continue  # caller timed out or was cancelled
+
+            try:
+                result = await session.call_tool(name, arguments)
+            except Exception as exc:
+                if attempt < self.max_attempts:
+                    held.append((name, arguments, future, attempt + 1))
+                elif not future.done():
+                    future.set_exception(exc)
+                return True
+
+            # The caller may have timed out while the call ran
+            if not future.done():
+                future.set_result(result)
@@ -1,12 +1,15 @@
+import json
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Optional
 
 from mcp.server.fastmcp import FastMCP
 from mcp.types import TextContent
 
-from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, models
 from langchain_openai import OpenAIEmbeddings
 
+from search_cache import SearchCache
+
 # ---------------------------------------------------------
 # Environment Setup
 # ---------------------------------------------------------
@@ -25,40 +28,202 @@ embedding_model = OpenAIEmbeddings(
 )
 
 # ---------------------------------------------------------
-# Qdrant Connection
+# Qdrant Connection (async, so searches never block the
+# event loop while other agents are being served)
 # ---------------------------------------------------------
-vector_db = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="learning_vectors",
-    embedding=embedding_model
-)
-print(vector_db.client.get_collection("learning_vectors"))
+COLLECTION_NAME = "learning_vectors"
+
+qdrant = AsyncQdrantClient(url="http://localhost:6333")
+
+# ---------------------------------------------------------
+# Search Result Cache (invalidated when the collection changes)
+# ---------------------------------------------------------
+search_cache = SearchCache(max_entries=1024, ttl_seconds=600)
+
+
+# ---------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------
+def build_filter(source: Optional[str], page: Optional[str]):
+    # Points written by langchain_qdrant keep metadata under "metadata"
+    conditions = []
+
+    if source:
+        conditions.append(
+            models.FieldCondition(
+                key="metadata.source",
+                match=models.MatchValue(value=source)
+            )
+        )
+    if page:
+        conditions.append(
+            models.FieldCondition(
+                key="metadata.page_label",
+                match=models.MatchValue(value=page)
+            )
+        )
+
+    return models.Filter(must=conditions) if conditions else None
+
+
+def to_text_content(point, query: Optional[str] = None) -> TextContent:
+    payload = point.payload or {}
+    metadata = payload.get("metadata", {})
+
+    page = metadata.get("page_label", "N/A")
+    source = metadata.get("source", "N/A")
+    meta = {"score": point.score, "page": page, "source": source}
+
+    # Batched results say which query they answer
+    header = ""
+    if query is not None:
+        header = f"Query: {query}\n\n"
+        meta["query"] = query
+
+    block = header + f"""
+Page Content:
+{payload.get("page_content", "")}
+
+Page Number: {page}
+Source File: {source}
+Score: {point.score:.4f}
+"""
+
+    return TextContent(
+        type="text",
+        text=block.strip(),
+        _meta=meta
+    )
+
+
+async def collection_version() -> int:
+    # Any ingest or delete changes the point count, which retires
+    # every cached result computed against the old collection
+    info = await qdrant.get_collection(COLLECTION_NAME)
+    return info.points_count or 0
+
+
+async def search(
+    queries: List[str],
+    k: int,
+    score_threshold: Optional[float],
+    source: Optional[str],
+    page: Optional[str],
+):
+    """
+    Returns one list of hits per query. Cached queries are answered
+    from search_cache; the rest are embedded together and searched
+    with a single Qdrant batch request.
+    """
+    version = await collection_version()
+    keys = [(query, k, score_threshold, source, page) for query in queries]
+    results = [search_cache.get(key, version) for key in keys]
+
+    missing = [i for i, hits in enumerate(results) if hits is None]
+    if not missing:
+        return results
+
+    vectors = await embedding_model.aembed_documents(
+        [queries[i] for i in missing]
+    )
+    query_filter = build_filter(source, page)
+
+    responses = await qdrant.query_batch_points(
+        collection_name=COLLECTION_NAME,
+        requests=[
+            models.QueryRequest(
+                query=vector,
+                limit=k,
+                score_threshold=score_threshold,
+                filter=query_filter,
+                with_payload=True
+            )
+            for vector in vectors
+        ]
+    )
+
+    for i, response in zip(missing, responses):
+        results[i] = response.points
+        search_cache.put(keys[i], version, response.points)
+
+    return results
+
+
 # ---------------------------------------------------------
-# MCP Tool: RAG Search (FIXED)
+# MCP Tool: RAG Search
 # ---------------------------------------------------------
 @mcp.tool()
-def rag_search(query: str):
+async def rag_search(
+    query: str,
+    k: int = 4,
+    score_threshold: Optional[float] = None,
+    source: Optional[str] = None,
+    page: Optional[str] = None,
+) -> List[TextContent]:
     """
     Perform similarity search over the document corpus.
-    Returns MCP-native TextContent blocks.
+    Returns one MCP-native TextContent block per hit, best first,
+    each carrying its similarity score, page and source.
+
+    Optional filters: minimum score, source file, page label.
     """
-    search_results = vector_db.similarity_search(query=query)
-    context_blocks = []
+    [hits] = await search([query], k, score_threshold, source, page)
+
+    return [to_text_content(point) for point in hits]
 
-    for result in search_results:
-        block = f"""
-    Page Content:
-    {result.page_content}
 
-    Page Number: {result.metadata.get("page_label", "N/A")}
-    Source File: {result.metadata.get("source", "N/A")}
+# ---------------------------------------------------------
+# MCP Tool: Batched RAG Search
+# ---------------------------------------------------------
+@mcp.tool()
+async def rag_search_many(
+    queries: List[str],
+    k: int = 4,
+    score_threshold: Optional[float] = None,
+    source: Optional[str] = None,
+    page: Optional[str] = None,
+    dedupe: bool = False,
+) -> List[TextContent]:
+    """
+    Run several similarity searches in one call (sub-questions,
+    query rewrites, ...). All queries are embedded together and
+    searched with a single Qdrant batch request.
+
+    Returns TextContent blocks grouped by query, in the order the
+    queries were given; each block names its query. With dedupe=True
+    a chunk is only returned for the first query that retrieved it.
+    """
+    if not queries:
+        return []
+
+    results = await search(queries, k, score_threshold, source, page)
+
+    blocks = []
+    seen = set()
+
+    for query, hits in zip(queries, results):
+        for point in hits:
+            if dedupe:
+                if point.id in seen:
+                    continue
+                seen.add(point.id)
+
+            blocks.append(to_text_content(point, query))
+
+    return blocks
+
+
+# ---------------------------------------------------------
+# MCP Resource: Cache Statistics
+# ---------------------------------------------------------
+@mcp.resource("rag://cache/stats", mime_type="application/json")
+def cache_stats() -> str:
+    """
+    Hit rate, size, evictions and invalidations of the search cache.
     """
-    context_blocks.append(block.strip())
+    return json.dumps(search_cache.stats())
 
-    context = "\n\n---\n\n".join(context_blocks)
-    return context
 
-    
 # ---------------------------------------------------------
 # Run Server
 # ---------------------------------------------------------
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+
+# ---------------------------------------------------------
+# Versioned LRU + TTL Cache for Search Results
+# ---------------------------------------------------------
+class SearchCache:
+    """
+    Maps a search key (query, k, filters) to its hits.
+
+    Every entry is tagged with the collection version it was computed
+    against. When the collection changes (new ingest, deletes), the
+    version changes and old entries are treated as misses and dropped,
+    so stale results are never served. Entries also expire after
+    `ttl_seconds`, and the least recently used entry is evicted once
+    `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version = None
+
+    def get(self, key, version):
+        self.version = version
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        entry_version, stored_at, value = entry
+
+        if entry_version != version:
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, version, value):
+        self._entries[key] = (version, time.monotonic(), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "collection_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
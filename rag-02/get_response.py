@@ -1,20 +1,84 @@
 import redis
 import time
 
+# -----------------------------------------
+# Redis connection
+# -----------------------------------------
 redis_client = redis.Redis(
     host="localhost",
     port=6379,
     decode_responses=True
 )
 
-job_id = input("Enter Job ID: ")
+WAIT_TIMEOUT_SECONDS = 120
 
-while True:
-    result = redis_client.get(f"rag:response:{job_id}")
-    if result:
-        print("\n🤖 Answer:")
-        print(result)
-        break
+
+# -----------------------------------------
+# Follow the worker's per-job event stream
+# -----------------------------------------
+def stream_response(job_id: str, timeout: int = WAIT_TIMEOUT_SECONDS):
+    """
+    Yields answer tokens as the worker produces them.
+
+    Reading the stream from "0" also returns events published before
+    we started listening, so there is no race with the worker. If no
+    tokens were seen (stream expired, or timeout) we fall back to a
+    single GET of the stored answer.
+    """
+    events_key = f"rag:events:{job_id}"
+    last_id = "0"
+    got_tokens = False
+
+    while True:
+        events = redis_client.xread(
+            {events_key: last_id},
+            block=timeout * 1000
+        )
+        if not events:
+            break  # timed out waiting for the next event
+
+        done = False
+        for event_id, fields in events[0][1]:
+            last_id = event_id
+
+            if fields["type"] == "token":
+                got_tokens = True
+                yield fields["delta"]
+            elif fields["type"] == "retry":
+                # The worker failed mid-answer; the next attempt starts over
+                if got_tokens:
+                    print(f"\n[Answer interrupted ({fields['error']}), retrying]")
+                got_tokens = False
+            elif fields["type"] == "done":
+                done = True
+            elif fields["type"] == "error":
+                # The job could not be answered; nothing more will come
+                print(f"\nJob failed: {fields['error']}")
+                done = True
+
+        if done:
+            break
+
+    if not got_tokens:
+        result = redis_client.get(f"rag:response:{job_id}")
+        if result:
+            yield result
+
+
+if __name__ == "__main__":
+    job_id = input("Enter Job ID: ")
 
     print("Waiting for response...")
-    time.sleep(2)
+    started_at = time.perf_counter()
+    ttft_ms = None
+
+    for token in stream_response(job_id):
+        if ttft_ms is None:
+            ttft_ms = round((time.perf_counter() - started_at) * 1000)
+            print("\n🤖 Answer:")
+        print(token, end="", flush=True)
+
+    if ttft_ms is None:
+        print(f"No response after {WAIT_TIMEOUT_SECONDS}s. Try again later.")
+    else:
+        print(f"\n\n(time to first token: {ttft_ms} ms)")
@@ -0,0 +1,108 @@
+import redis
+import time
+import uuid
+import argparse
+import statistics
+
+from rag_queue import (
+    LANES,
+    WEIGHTS_KEY,
+    enqueue_job,
+    dequeue_job,
+    decode_payload,
+    record_wait,
+    wait_samples_key,
+)
+
+# -----------------------------------------
+# Synthetic load for the rag-02 scheduler
+# -----------------------------------------
+# Replays a "bulk tenant + interactive users" mix through the same
+# enqueue/dequeue code the producer and worker use, with a fake service
+# time instead of the LLM. Runs against a separate Redis DB so it never
+# touches real jobs.
+# -----------------------------------------
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * pct / 100))
+    return values[index]
+
+
+def submit(redis_client, lane, tenant_id):
+    enqueue_job(redis_client, {
+        "job_id": str(uuid.uuid4()),
+        "query": "synthetic",
+        "priority": lane,
+        "tenant_id": tenant_id,
+        "enqueued_at": time.time()
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--bulk-jobs", type=int, default=200)
+    parser.add_argument("--interactive-tenants", type=int, default=3)
+    parser.add_argument("--interactive-jobs", type=int, default=20)
+    parser.add_argument("--service-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    redis_client = redis.Redis(
+        host="localhost",
+        port=6379,
+        db=args.db,
+        decode_responses=True
+    )
+    redis_client.flushdb()
+
+    # Two batch tenants, one with twice the share of the other
+    redis_client.hset(WEIGHTS_KEY, mapping={"bulk-a": 2, "bulk-b": 1})
+
+    for i in range(args.bulk_jobs):
+        submit(redis_client, "batch", "bulk-a" if i % 2 else "bulk-b")
+
+    # Interactive users trickle in while the bulk backlog drains
+    pending_interactive = [
+        f"user-{t}"
+        for _ in range(args.interactive_jobs)
+        for t in range(args.interactive_tenants)
+    ]
+
+    while True:
+        if pending_interactive:
+            submit(redis_client, "interactive", pending_interactive.pop())
+
+        job = dequeue_job(redis_client, timeout=1)
+        if job is None:
+            break
+
+        lane, tenant_id, raw_payload = job
+        payload = decode_payload(raw_payload)
+        record_wait(redis_client, lane, tenant_id, payload["enqueued_at"])
+        time.sleep(args.service_ms / 1000)
+
+    # -----------------------------------------
+    # Report queue-wait per lane and tenant
+    # -----------------------------------------
+    print(f"{'lane':<12} {'tenant':<10} {'jobs':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+
+    for lane in LANES:
+        by_tenant = {}
+        for sample in redis_client.lrange(wait_samples_key(lane), 0, -1):
+            tenant_id, wait_ms = sample.rsplit(":", 1)
+            by_tenant.setdefault(tenant_id, []).append(int(wait_ms))
+
+        for tenant_id, waits in sorted(by_tenant.items()):
+            print(
+                f"{lane:<12} {tenant_id:<10} {len(waits):>5} "
+                f"{statistics.median(waits):>8.0f} "
+                f"{percentile(waits, 95):>8} {max(waits):>8}"
+            )
+
+    redis_client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import time
+import redis
+
+from prometheus_client import start_http_server
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from rag_queue import LANES, WAKEUP_KEY, queue_key, tenants_key, decode_payload
+
+# -----------------------------------------
+# Queue metrics sidecar
+# -----------------------------------------
+# Workers only know about the jobs they run. Queue depth and the age of
+# the oldest waiting job live in Redis, so this small process reads them
+# on every scrape and exposes them for dashboards and the autoscaler
+# (e.g. an HPA on rag_queue_depth via prometheus-adapter).
+# -----------------------------------------
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9101"))
+
+redis_client = redis.Redis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", "6379")),
+    decode_responses=True
+)
+
+
+class QueueCollector:
+    def collect(self):
+        depth = GaugeMetricFamily(
+            "rag_queue_depth",
+            "Jobs waiting per lane and tenant",
+            labels=["lane", "tenant"]
+        )
+        oldest_age = GaugeMetricFamily(
+            "rag_queue_oldest_job_age_seconds",
+            "Age of the oldest waiting job per lane",
+            labels=["lane"]
+        )
+        total = GaugeMetricFamily(
+            "rag_queue_depth_total",
+            "Jobs waiting across all lanes"
+        )
+
+        now = time.time()
+
+        for lane in LANES:
+            tenants = redis_client.zrange(tenants_key(lane), 0, -1)
+
+            # One round trip per lane: length and head of every tenant queue
+            pipe = redis_client.pipeline(transaction=False)
+            for tenant_id in tenants:
+                pipe.llen(queue_key(lane, tenant_id))
+                pipe.lindex(queue_key(lane, tenant_id), 0)
+            replies = pipe.execute()
+
+            lane_oldest = 0.0
+            for i, tenant_id in enumerate(tenants):
+                length, head = replies[2 * i], replies[2 * i + 1]
+                depth.add_metric([lane, tenant_id], length)
+
+                if head:
+                    enqueued_at = decode_payload(head).get("enqueued_at", now)
+                    lane_oldest = max(lane_oldest, now - enqueued_at)
+
+            oldest_age.add_metric([lane], lane_oldest)
+
+        # Every queued job holds exactly one wakeup token
+        total.add_metric([], redis_client.llen(WAKEUP_KEY))
+
+        yield depth
+        yield oldest_age
+        yield total
+
+
+if __name__ == "__main__":
+    REGISTRY.register(QueueCollector())
+    start_http_server(METRICS_PORT)
+    print(f"Queue metrics on :{METRICS_PORT}/metrics")
+
+    while True:
+        time.sleep(3600)
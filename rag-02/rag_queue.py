@@ -0,0 +1,230 @@
+import ast
+import json
+import time
+
+# -----------------------------------------
+# Queue layout
+# -----------------------------------------
+# Each (lane, tenant) pair has its own FIFO list:
+#   rag:requests:{lane}:{tenant}
+#
+# Each lane keeps a sorted set of tenants with pending jobs, scored by
+# the tenant's virtual finish time (weighted fair queuing):
+#   rag:tenants:{lane}
+#
+# Lanes are served in strict priority order: a batch job only runs
+# when no interactive job is waiting.
+#
+# Every enqueued job also pushes one token to rag:wakeup, so workers
+# can BLPOP on a single key instead of polling all tenant lists.
+# -----------------------------------------
+LANES = ("interactive", "batch")
+
+DEFAULT_LANE = "interactive"
+DEFAULT_TENANT = "default"
+
+WAKEUP_KEY = "rag:wakeup"
+
+# Single list used before lanes and tenants existed (str(dict) payloads)
+LEGACY_QUEUE_KEY = "rag:requests"
+
+# Optional per-tenant weights (HSET rag:tenant_weights <tenant> <weight>)
+WEIGHTS_KEY = "rag:tenant_weights"
+
+# Number of queue-wait samples kept per lane
+WAIT_SAMPLES = 1000
+
+# Payload schema version written by encode_payload
+PAYLOAD_VERSION = 1
+
+
+def queue_key(lane: str, tenant_id: str) -> str:
+    return f"rag:requests:{lane}:{tenant_id}"
+
+
+def tenants_key(lane: str) -> str:
+    return f"rag:tenants:{lane}"
+
+
+def wait_samples_key(lane: str) -> str:
+    return f"rag:stats:wait:{lane}"
+
+
+# -----------------------------------------
+# Lua: enqueue one job
+# -----------------------------------------
+# A tenant that was idle re-enters at the lane's current virtual time,
+# so it cannot "bank" credit while idle and then monopolise workers.
+_ENQUEUE_LUA = """
+local queue = KEYS[1]
+local tenants = KEYS[2]
+local vclock = KEYS[3]
+local wakeup = KEYS[4]
+
+redis.call('RPUSH', queue, ARGV[1])
+
+if not redis.call('ZSCORE', tenants, ARGV[2]) then
+    local now = redis.call('GET', vclock) or '0'
+    redis.call('ZADD', tenants, now, ARGV[2])
+end
+
+redis.call('RPUSH', wakeup, ARGV[3])
+return 1
+"""
+
+# -----------------------------------------
+# Lua: pick the next job
+# -----------------------------------------
+# Walks lanes in priority order. Inside a lane, the tenant with the
+# smallest virtual finish time goes next and is charged 1 / weight.
+_DEQUEUE_LUA = """
+local weights = KEYS[1]
+
+for _, lane in ipairs(ARGV) do
+    local tenants = 'rag:tenants:' .. lane
+
+    while true do
+        local head = redis.call('ZRANGE', tenants, 0, 0, 'WITHSCORES')
+        if #head == 0 then
+            break
+        end
+
+        local tenant = head[1]
+        local vtime = tonumber(head[2])
+        local queue = 'rag:requests:' .. lane .. ':' .. tenant
+        local job = redis.call('LPOP', queue)
+
+        if job then
+            local weight = tonumber(redis.call('HGET', weights, tenant) or '1')
+
+            if redis.call('LLEN', queue) > 0 then
+                redis.call('ZADD', tenants, vtime + 1 / weight, tenant)
+            else
+                redis.call('ZREM', tenants, tenant)
+            end
+
+            redis.call('SET', 'rag:vclock:' .. lane, tostring(vtime))
+            return {lane, tenant, job}
+        end
+
+        redis.call('ZREM', tenants, tenant)
+    end
+end
+
+return false
+"""
+
+
+# -----------------------------------------
+# Payload schema
+# -----------------------------------------
+# Compact JSON with a "v" field:
+#   {"v":1,"job_id":...,"query":...,"priority":...,"tenant_id":...,"enqueued_at":...}
+def encode_payload(payload: dict) -> str:
+    return json.dumps({"v": PAYLOAD_VERSION, **payload}, separators=(",", ":"))
+
+
+def decode_payload(raw_payload: str) -> dict:
+    payload = json.loads(raw_payload)
+    if payload.get("v", 1) > PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported payload version: {payload['v']}")
+
+    return payload
+
+
+# -----------------------------------------
+# Producer side
+# -----------------------------------------
+def _enqueue(script, client, payload: dict):
+    lane = payload["priority"]
+    tenant_id = payload["tenant_id"]
+
+    if lane not in LANES:
+        raise ValueError(f"Unknown priority lane: {lane}")
+
+    script(
+        keys=[
+            queue_key(lane, tenant_id),
+            tenants_key(lane),
+            f"rag:vclock:{lane}",
+            WAKEUP_KEY,
+        ],
+        args=[encode_payload(payload), tenant_id, lane],
+        client=client
+    )
+
+
+def enqueue_job(redis_client, payload: dict):
+    _enqueue(redis_client.register_script(_ENQUEUE_LUA), redis_client, payload)
+
+
+def enqueue_jobs(redis_client, payloads, batch_size: int = 500):
+    """
+    Enqueues payloads in pipelined batches (one round trip per batch)
+    and yields each job ID once its batch is written.
+    """
+    script = redis_client.register_script(_ENQUEUE_LUA)
+    pipe = redis_client.pipeline(transaction=False)
+    pending = []
+
+    for payload in payloads:
+        _enqueue(script, pipe, payload)
+        pending.append(payload["job_id"])
+
+        if len(pending) >= batch_size:
+            pipe.execute()
+            yield from pending
+            pending = []
+
+    if pending:
+        pipe.execute()
+        yield from pending
+
+
+# -----------------------------------------
+# Worker side
+# -----------------------------------------
+def dequeue_job(redis_client, timeout: int = 0):
+    """
+    Blocks until a job is available and returns (lane, tenant_id, raw_payload),
+    or None on timeout.
+    """
+    if not redis_client.blpop(WAKEUP_KEY, timeout=timeout):
+        return None
+
+    return redis_client.eval(_DEQUEUE_LUA, 1, WEIGHTS_KEY, *LANES)
+
+
+def migrate_legacy_queue(redis_client) -> int:
+    """
+    Moves jobs left in the pre-lanes rag:requests list onto the default
+    lane and tenant. Safe to run from every worker at startup: LPOP
+    hands each job to exactly one of them.
+    """
+    migrated = 0
+    while True:
+        raw_payload = redis_client.lpop(LEGACY_QUEUE_KEY)
+        if raw_payload is None:
+            return migrated
+
+        legacy = ast.literal_eval(raw_payload)
+        enqueue_job(redis_client, {
+            "job_id": legacy["job_id"],
+            "query": legacy["query"],
+            "priority": legacy.get("priority", DEFAULT_LANE),
+            "tenant_id": legacy.get("tenant_id", DEFAULT_TENANT),
+            # Their real wait is unknown; count it from the migration
+            "enqueued_at": legacy.get("enqueued_at", time.time()),
+        })
+        migrated += 1
+
+
+def record_wait(redis_client, lane: str, tenant_id: str, enqueued_at: float):
+    wait_ms = round((time.time() - enqueued_at) * 1000)
+
+    pipe = redis_client.pipeline()
+    pipe.lpush(wait_samples_key(lane), f"{tenant_id}:{wait_ms}")
+    pipe.ltrim(wait_samples_key(lane), 0, WAIT_SAMPLES - 1)
+    pipe.execute()
+
+    return wait_ms
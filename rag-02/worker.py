@@ -1,10 +1,18 @@
+import os
 import redis
-import ast
+import time
+import socket
+import hashlib
 from dotenv import load_dotenv
 from openai import OpenAI
 
 from langchain_qdrant import QdrantVectorStore
 from langchain_openai import OpenAIEmbeddings
+from prometheus_client import Counter, Histogram, start_http_server
+
+from rag_queue import (
+    dequeue_job, decode_payload, enqueue_job, migrate_legacy_queue, record_wait
+)
 
 # -----------------------------------------
 # Environment
@@ -31,30 +39,166 @@ embedding_model = OpenAIEmbeddings(
 # -----------------------------------------
 # Qdrant
 # -----------------------------------------
+COLLECTION_NAME = "learning_vectors"
+
 vector_db = QdrantVectorStore.from_existing_collection(
     url="http://localhost:6333",
-    collection_name="learning_vectors",
+    collection_name=COLLECTION_NAME,
     embedding=embedding_model
 )
 
-print("Worker started. Waiting for jobs...")
+# Token streams are short-lived; late readers use rag:response:{job_id}
+EVENT_TTL_SECONDS = 3600
+
+# How long a finished answer is reused for identical questions
+CACHE_TTL_SECONDS = 600
+
+# Upper bound on one computation, so a crashed worker's lock expires
+INFLIGHT_TTL_SECONDS = 300
+
+# Waiters outlive the lock so a crashed owner's waiters can be recovered
+WAITERS_TTL_SECONDS = 3 * INFLIGHT_TTL_SECONDS
+
+# How often idle workers look for waiters whose owner is gone
+REAP_INTERVAL_SECONDS = 30
+
+# A job whose computation failed this many times gets an error event
+MAX_JOB_ATTEMPTS = 3
 
 # -----------------------------------------
-# Worker Loop
+# Metrics (scraped from http://<worker>:METRICS_PORT/metrics)
 # -----------------------------------------
-while True:
-    _, raw_payload = redis_client.blpop("rag:requests")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+WORKER_ID = os.getenv("WORKER_ID", f"{socket.gethostname()}-{os.getpid()}")
 
-    payload = ast.literal_eval(raw_payload)
-    job_id = payload["job_id"]
-    query = payload["query"]
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+QUEUE_WAIT = Histogram(
+    "rag_job_queue_wait_seconds",
+    "Time from enqueue to a worker starting the job",
+    ["lane"],
+    buckets=LATENCY_BUCKETS
+)
+JOB_DURATION = Histogram(
+    "rag_job_duration_seconds",
+    "Time from a worker starting the job to delivering the answer",
+    ["lane", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    "rag_job_stage_seconds",
+    "Time spent in each processing stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "rag_job_time_to_first_token_seconds",
+    "Time from starting the LLM call to its first token",
+    buckets=LATENCY_BUCKETS
+)
+JOBS_PROCESSED = Counter(
+    "rag_jobs_processed_total",
+    "Jobs finished by this worker",
+    ["worker", "lane", "outcome"]
+)
+
+
+# -----------------------------------------
+# Dedup Key (normalized query + collection version)
+# -----------------------------------------
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def collection_version() -> int:
+    # Re-indexing changes the point count, which retires old cache entries
+    info = vector_db.client.get_collection(COLLECTION_NAME)
+    return info.points_count or 0
+
+
+def dedup_key(query: str) -> str:
+    raw = f"{collection_version()}:{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------
+# Deliver an answer to one job
+# -----------------------------------------
+def deliver(job_id: str, answer: str, ttft_ms: int = 0):
+    # The "done" event goes to the per-job stream so clients can block
+    # on XREAD instead of polling. Streams keep their entries, so a
+    # client that starts reading after we finish still sees everything.
+    events_key = f"rag:events:{job_id}"
+
+    pipe = redis_client.pipeline()
+    pipe.set(
+        f"rag:response:{job_id}",
+        answer,
+        ex=3600  # optional TTL
+    )
+    pipe.xadd(events_key, {"type": "done", "ttft_ms": ttft_ms})
+    pipe.expire(events_key, EVENT_TTL_SECONDS)
+    pipe.execute()
+
+
+def deliver_error(job_id: str, error: str):
+    events_key = f"rag:events:{job_id}"
+
+    pipe = redis_client.pipeline()
+    pipe.xadd(events_key, {"type": "error", "error": error})
+    pipe.expire(events_key, EVENT_TTL_SECONDS)
+    pipe.execute()
+
+
+# -----------------------------------------
+# Hand failed jobs back to the queue
+# -----------------------------------------
+def retry_or_fail(payload: dict, error: str) -> bool:
+    # Requeues the job until it has failed MAX_JOB_ATTEMPTS times, then
+    # tells its client; returns True if it was requeued
+    payload["attempts"] = payload.get("attempts", 0) + 1
+
+    if payload["attempts"] >= MAX_JOB_ATTEMPTS:
+        deliver_error(payload["job_id"], error)
+        return False
+
+    # Tokens streamed so far will be streamed again by the retry
+    redis_client.xadd(f"rag:events:{payload['job_id']}", {"type": "retry", "error": error})
+    enqueue_job(redis_client, payload)
+    return True
+
+
+def requeue_waiters(waiters_key: str, error: str) -> int:
+    pipe = redis_client.pipeline()
+    pipe.lrange(waiters_key, 0, -1)
+    pipe.delete(waiters_key)
+    waiters, _ = pipe.execute()
+
+    for raw_waiter in waiters:
+        retry_or_fail(decode_payload(raw_waiter), error)
+
+    return len(waiters)
 
-    print(f"Processing job {job_id}")
 
+def reap_orphaned_waiters() -> int:
+    # Waiters whose owner died mid-job: the lock expired, the list did not
+    requeued = 0
+    for waiters_key in redis_client.scan_iter(match="rag:waiters:*"):
+        key = waiters_key.rsplit(":", 1)[-1]
+        if not redis_client.exists(f"rag:inflight:{key}"):
+            requeued += requeue_waiters(waiters_key, "owner worker crashed")
+    return requeued
+
+
+# -----------------------------------------
+# Retrieval + LLM (streamed to the job's events)
+# -----------------------------------------
+def answer_query(job_id: str, query: str):
     # -----------------------------------------
     # Similarity Search
     # -----------------------------------------
-    search_results = vector_db.similarity_search(query=query)
+    with STAGE_DURATION.labels("retrieval").time():
+        search_results = vector_db.similarity_search(query=query)
 
     context_blocks = []
     for result in search_results:
@@ -95,25 +239,154 @@ Document Context:
 """
 
     # -----------------------------------------
-    # LLM Call
+    # LLM Call (streamed)
     # -----------------------------------------
-    response = client.chat.completions.create(
+    events_key = f"rag:events:{job_id}"
+    started_at = time.perf_counter()
+    ttft_ms = None
+
+    stream = client.chat.completions.create(
         model="gpt-4.1",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": query},
-        ]
+        ],
+        stream=True
     )
 
-    answer = response.choices[0].message.content
+    answer_parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+
+        # Every delta is appended to the per-job stream right away,
+        # so clients can render the answer while it is generated.
+        redis_client.xadd(events_key, {"type": "token", "delta": delta})
+
+        if ttft_ms is None:
+            ttft_ms = round((time.perf_counter() - started_at) * 1000)
+            redis_client.expire(events_key, EVENT_TTL_SECONDS)
+
+        answer_parts.append(delta)
+
+    STAGE_DURATION.labels("llm").observe(time.perf_counter() - started_at)
+    if ttft_ms is not None:
+        TIME_TO_FIRST_TOKEN.observe(ttft_ms / 1000)
+
+    return "".join(answer_parts), ttft_ms or 0
+
+
+def finish(lane: str, outcome: str, started_at: float):
+    JOB_DURATION.labels(lane, outcome).observe(time.perf_counter() - started_at)
+    JOBS_PROCESSED.labels(WORKER_ID, lane, outcome).inc()
+
+
+start_http_server(METRICS_PORT)
+
+migrated = migrate_legacy_queue(redis_client)
+if migrated:
+    print(f"Moved {migrated} jobs from the old rag:requests list")
+
+print(f"Worker {WORKER_ID} started (metrics on :{METRICS_PORT}). Waiting for jobs...")
+
+# -----------------------------------------
+# Worker Loop
+# -----------------------------------------
+last_reap = 0.0
+
+while True:
+    if time.monotonic() - last_reap > REAP_INTERVAL_SECONDS:
+        last_reap = time.monotonic()
+        reaped = reap_orphaned_waiters()
+        if reaped:
+            print(f"Requeued {reaped} jobs orphaned by a crashed worker")
+
+    job = dequeue_job(redis_client, timeout=REAP_INTERVAL_SECONDS)
+    if job is None:
+        continue
+
+    lane, tenant_id, raw_payload = job
+    job_started_at = time.perf_counter()
+
+    payload = decode_payload(raw_payload)
+    job_id = payload["job_id"]
+    query = payload["query"]
+
+    wait_ms = record_wait(redis_client, lane, tenant_id, payload["enqueued_at"])
+    QUEUE_WAIT.labels(lane).observe(wait_ms / 1000)
+    print(f"Job {job_id} [{lane}/{tenant_id}] waited {wait_ms} ms in queue")
+
+    key = dedup_key(query)
+    cache_key = f"rag:cache:{key}"
+    inflight_key = f"rag:inflight:{key}"
+    waiters_key = f"rag:waiters:{key}"
 
     # -----------------------------------------
-    # Store Result
+    # 1. Recently answered -> serve from cache
     # -----------------------------------------
-    redis_client.set(
-        f"rag:response:{job_id}",
-        answer,
-        ex=3600  # optional TTL
-    )
+    cached = redis_client.get(cache_key)
+    if cached is not None:
+        deliver(job_id, cached)
+        finish(lane, "cached", job_started_at)
+        print(f"Job {job_id} served from cache")
+        continue
+
+    # -----------------------------------------
+    # 2. Same question running elsewhere -> attach to it
+    # -----------------------------------------
+    if not redis_client.set(inflight_key, job_id, nx=True, ex=INFLIGHT_TTL_SECONDS):
+        # The full payload, so the job can be requeued if the owner fails
+        pipe = redis_client.pipeline()
+        pipe.rpush(waiters_key, raw_payload)
+        pipe.expire(waiters_key, WAITERS_TTL_SECONDS)
+        pipe.execute()
+
+        # The owner may have finished between our cache check and the
+        # push; delivering twice is harmless, never delivering is not.
+        cached = redis_client.get(cache_key)
+        if cached is not None:
+            deliver(job_id, cached)
+
+        finish(lane, "attached", job_started_at)
+        print(f"Job {job_id} attached to in-flight computation")
+        continue
+
+    # -----------------------------------------
+    # 3. We own the computation
+    # -----------------------------------------
+    print(f"Processing job {job_id}")
+
+    try:
+        answer, ttft_ms = answer_query(job_id, query)
+    except Exception as exc:
+        # One failed job (LLM or Qdrant error) must not take the worker down
+        redis_client.delete(inflight_key)
+        requeued = requeue_waiters(waiters_key, repr(exc))
+        retried = retry_or_fail(payload, repr(exc))
+        finish(lane, "failed", job_started_at)
+        print(f"Job {job_id} failed ({exc!r}), {'requeued' if retried else 'gave up'}; "
+              f"{requeued} attached jobs handed back")
+        continue
+
+    # Cache first, then release the lock, then drain waiters: any
+    # duplicate arriving in between finds either the cache or the lock.
+    redis_client.set(cache_key, answer, ex=CACHE_TTL_SECONDS)
+    deliver(job_id, answer, ttft_ms)
+
+    pipe = redis_client.pipeline()
+    pipe.delete(inflight_key)
+    pipe.lrange(waiters_key, 0, -1)
+    pipe.delete(waiters_key)
+    _, waiters, _ = pipe.execute()
+
+    for raw_waiter in waiters:
+        deliver(decode_payload(raw_waiter)["job_id"], answer)
+
+    finish(lane, "computed", job_started_at)
 
-    print(f"Job {job_id} completed")
+    print(f"Job {job_id} completed (time to first token: {ttft_ms} ms, "
+          f"{len(waiters)} attached)")